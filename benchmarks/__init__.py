@@ -0,0 +1,7 @@
+"""
+asv benchmarks for epsilon.
+
+Run with ``asv run`` from the repository root. Results are kept per commit in
+.asv/results, ``asv compare`` and ``asv publish`` show regressions between
+commits.
+"""
@@ -0,0 +1,36 @@
+from epsilon.data import Data
+from .common import n_columns, n_weeks, weekly_frame, disable_cache
+
+
+class Transforms:
+    params = (n_columns, n_weeks)
+    param_names = ["columns", "weeks"]
+    timeout = 300
+
+    def setup(self, columns, weeks):
+        disable_cache()
+        self.data = Data(weekly_frame(columns, weeks))
+        self.media = self.data.columns.tolist()[1:]
+
+    def time_adstock(self, columns, weeks):
+        self.data.adstock(self.media, [0.3, 0.5, 0.7, 0.9], inplace=False)
+
+    def time_atan(self, columns, weeks):
+        self.data.atan(self.media, [0.25, 0.5, 1.0], inplace=False)
+
+    def time_lag(self, columns, weeks):
+        self.data.lag(self.media, 1, 0, inplace=False)
+
+    def peakmem_adstock(self, columns, weeks):
+        self.data.adstock(self.media, [0.3, 0.5, 0.7, 0.9], inplace=False)
+
+
+class DataInit:
+    params = (n_columns, n_weeks)
+    param_names = ["columns", "weeks"]
+
+    def setup(self, columns, weeks):
+        self.df = weekly_frame(columns, weeks)
+
+    def time_init(self, columns, weeks):
+        Data(self.df)
@@ -0,0 +1,32 @@
+from epsilon.core import EO
+from .common import n_columns, n_weeks, weekly_frame, disable_cache
+
+
+class Fit:
+    params = (n_columns, n_weeks)
+    param_names = ["columns", "weeks"]
+    timeout = 300
+
+    def setup(self, columns, weeks):
+        disable_cache()
+        self.eo = EO(weekly_frame(columns, weeks))
+        self.eo.model.dep("sales")
+        variables = self.eo.data.columns.tolist()[1:]
+        self.eo.model.add(variables[:min(20, weeks // 4)])
+        self.spare = variables[-1]
+        self.eo.model.ols(summary=False)
+
+    def time_ols(self, columns, weeks):
+        self.eo.model.ols(refit=True, summary=False)
+
+    def time_ols_add_remove(self, columns, weeks):
+        self.eo.model.add(self.spare)
+        self.eo.model.ols(summary=False)
+        self.eo.model.rem(self.spare)
+        self.eo.model.ols(summary=False)
+
+    def time_ols_summary(self, columns, weeks):
+        str(self.eo.model.ols())
+
+    def time_preview(self, columns, weeks):
+        self.eo.model.preview()
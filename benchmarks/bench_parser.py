@@ -0,0 +1,28 @@
+import shutil
+import tempfile
+import epsilon._parser
+from epsilon.datasets import mmm, to_workbooks
+
+
+class ReadFolder:
+    params = ([4, 16], [1, 4])
+    param_names = ["workbooks", "workers"]
+    timeout = 600
+
+    def setup(self, workbooks, workers):
+        self.folder = tempfile.mkdtemp()
+        self.cache = tempfile.mkdtemp()
+        df, truth = mmm(weeks=260, regions=workbooks, channels=20)
+        to_workbooks(df, truth, self.folder)
+
+    def teardown(self, workbooks, workers):
+        shutil.rmtree(self.folder)
+        shutil.rmtree(self.cache)
+
+    def time_read_folder(self, workbooks, workers):
+        epsilon._parser.read_folder(self.folder, workers=workers,
+                                    cache=False)
+
+    def time_read_folder_cached(self, workbooks, workers):
+        epsilon._parser.read_folder(self.folder, workers=workers,
+                                    cache=self.cache)
@@ -0,0 +1,31 @@
+import pandas as pd
+import epsilon.plotting
+from .common import weekly_frame
+
+
+def _document(plot):
+    """build and serialise the bokeh document instead of showing it"""
+    from bokeh.embed import json_item
+    json_item(plot)
+
+
+class Charts:
+    params = ([5, 30], [52, 1040])
+    param_names = ["series", "weeks"]
+
+    def setup(self, series, weeks):
+        self._show = epsilon.plotting.show
+        epsilon.plotting.show = _document
+        df = weekly_frame(series, weeks)
+        df.index = pd.to_datetime(df.index)
+        self.lines = df.iloc[:, 1:]
+        self.sales = df["sales"]
+
+    def teardown(self, series, weeks):
+        epsilon.plotting.show = self._show
+
+    def time_line(self, series, weeks):
+        epsilon.plotting.line(self.lines)
+
+    def time_stacked_bar_and_line(self, series, weeks):
+        epsilon.plotting.stackedBarAndLine(self.sales, self.lines)
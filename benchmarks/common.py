@@ -0,0 +1,19 @@
+# sizes shared by the benchmarks: number of variables and weeks of data
+n_columns = [100, 1000, 5000]
+n_weeks = [52, 520, 1040]
+
+
+def weekly_frame(columns, weeks, seed=0):
+    """generated weekly data with a sales column and media columns"""
+    from epsilon.datasets import mmm
+    df, truth = mmm(weeks=weeks, channels=columns, seed=seed)
+    df = df[truth["sales"] + truth["media"]]
+    df.columns = [x.split("_", 1)[1] for x in df.columns]
+    df.index = df.index.astype(str)
+    return df
+
+
+def disable_cache():
+    """benchmarks time the computation, not the transform cache"""
+    import epsilon.cache
+    epsilon.cache.configure(max_bytes=0)
@@ -1,3 +0,0 @@
-
-from bokeh.plotting import output_notebook as _output_notebook
-_output_notebook()
@@ -0,0 +1,219 @@
+"""
+graph of the transformations applied to a Data object.
+
+Every transformed variable is recorded as a recipe naming its source
+variables, the operation and its parameters. Recipes can be registered
+without computing them and evaluated later in batches, so that recipes
+sharing an operation are computed in a single call to the array kernels.
+"""
+from collections import namedtuple, OrderedDict
+import numpy as np
+
+
+class Recipe(namedtuple("Recipe", "name op sources param static")):
+    """
+    How a transformed variable is made
+
+    Attributes
+    ----------
+    name : string
+            name of the transformed variable
+    op : string
+            one of 'filter', 'saturate', 'shift' or 'mult'
+    sources : tuple of strings
+            the variables the transformation is applied to
+    param : float or None
+            the parameter the operation is vectorised over, e.g. the
+            carryover rate of a filter or the alpha of a saturation curve
+    static : tuple of (key, value) pairs
+            other keyword arguments of the operation
+    """
+    __slots__ = ()
+
+    @property
+    def kwargs(self):
+        return dict(self.static)
+
+
+def _op_filter(block, params, dtype=np.float64):
+    from epsilon._transforms import recursive_filter
+    return recursive_filter(block, params, dtype=dtype).transpose(2, 1, 0)
+
+
+def _op_saturate(block, params, curve, scale=True, shape=1.0):
+    from epsilon._transforms import saturate
+    return saturate(block, params, curve, scale=scale, shape=shape)
+
+
+def _op_shift(block, params, fill=0):
+    from epsilon._transforms import shift
+    return shift(block, params, fill=fill)
+
+
+_ops = {"filter": _op_filter,
+        "saturate": _op_saturate,
+        "shift": _op_shift}
+
+
+class TransformGraph:
+    """
+    Ordered collection of recipes, keeping track of which have not yet been
+    computed
+    """
+
+    def __init__(self):
+        self.recipes = OrderedDict()
+        self.pending = set()
+
+    def __contains__(self, name):
+        return name in self.recipes
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def add(self, recipe, pending=True):
+        """register a recipe, recipes for existing names are ignored"""
+        if recipe.name in self.recipes:
+            return False
+        self.recipes[recipe.name] = recipe
+        if pending:
+            self.pending.add(recipe.name)
+        return True
+
+    def done(self, names):
+        """mark recipes as computed"""
+        self.pending.difference_update(names)
+
+    def resolve(self, names=None):
+        """
+        pending recipes needed to compute names, sources before the
+        variables made from them
+
+        Parameters
+        ----------
+        names : list, default None
+                variables to compute, defaults to all pending variables
+        """
+        if names is None:
+            names = list(self.recipes)
+        order = []
+        seen = set()
+
+        def visit(name):
+            if name in seen or name not in self.pending:
+                return
+            seen.add(name)
+            recipe = self.recipes[name]
+            for source in recipe.sources:
+                visit(source)
+            order.append(recipe)
+        for name in names:
+            visit(name)
+        return order
+
+    def chain(self, name):
+        """
+        recipes from a raw variable to name, in the order they are applied.
+        Variables that are not the result of a recipe have an empty chain
+        """
+        chain = []
+        while name in self.recipes:
+            recipe = self.recipes[name]
+            chain.insert(0, recipe)
+            if len(recipe.sources) != 1:
+                break
+            name = recipe.sources[0]
+        return chain
+
+
+def _compute(op, static, batch, column):
+    """
+    internal function to compute a batch of recipes sharing an operation
+    with one kernel call
+    """
+    if op == "mult":
+        return dict((x.name, column(x.sources[0], fill=False) *
+                     column(x.sources[1], fill=False)) for x in batch)
+    sources = list(OrderedDict.fromkeys(x.sources[0] for x in batch))
+    params = list(OrderedDict.fromkeys(x.param for x in batch))
+    block = np.column_stack([column(x) for x in sources])
+    out = _ops[op](block, params, **dict(static))
+    return dict((x.name, out[:, params.index(x.param),
+                             sources.index(x.sources[0])]) for x in batch)
+
+
+def evaluate(recipes, fetch, cache=None):
+    """
+    compute recipes, batching recipes of the same operation and parameters
+    into one call of the array kernels
+
+    Parameters
+    ----------
+    recipes : list of Recipe
+            in dependency order, as returned by TransformGraph.resolve
+    fetch : function
+            fetch(name, fill) returns a variable that is not the result of
+            one of the recipes as an array, with missing values set to zero
+            when fill is True
+    cache : epsilon.cache.TransformCache, default None
+            cache to reuse earlier results from and store new results in
+
+    Returns
+    -------
+    OrderedDict of name: ndarray
+    """
+    computed = OrderedDict()
+    digests = {}
+
+    def column(name, fill=True):
+        if name in computed:
+            return computed[name]
+        return fetch(name, fill)
+
+    def cache_key(recipe):
+        fill = recipe.op != "mult"
+        for x in recipe.sources:
+            if (x, fill) not in digests:
+                digests[(x, fill)] = cache.digest(column(x, fill=fill))
+        return cache.key([digests[(x, fill)] for x in recipe.sources],
+                         recipe.op, recipe.param, recipe.static)
+
+    # recipes can only be batched with others at the same depth in the graph
+    level = {}
+    groups = OrderedDict()
+    for recipe in recipes:
+        level[recipe.name] = 1 + max([level.get(x, 0)
+                                      for x in recipe.sources])
+        key = (level[recipe.name], recipe.op, recipe.static)
+        groups.setdefault(key, []).append(recipe)
+
+    for (_, op, static), group in groups.items():
+        if cache is not None:
+            keys = dict((x.name, cache_key(x)) for x in group)
+            misses = []
+            for recipe in group:
+                values = cache.get(keys[recipe.name])
+                if values is None:
+                    misses.append(recipe)
+                else:
+                    computed[recipe.name] = values
+            group = misses
+        sources = set(x.sources for x in group)
+        params = set(x.param for x in group)
+        if len(sources) * len(params) > 2 * len(group):
+            # mostly unrelated recipes, batch per parameter instead
+            batches = OrderedDict()
+            for recipe in group:
+                batches.setdefault(recipe.param, []).append(recipe)
+            batches = list(batches.values())
+        else:
+            batches = [group]
+        for batch in batches:
+            if batch == []:
+                continue
+            values = _compute(op, static, batch, column)
+            for recipe in batch:
+                computed[recipe.name] = values[recipe.name]
+                if cache is not None:
+                    cache.put(keys[recipe.name], np.array(values[recipe.name]))
+    return OrderedDict((x.name, computed[x.name]) for x in recipes)
@@ -0,0 +1,184 @@
+"""
+opt in instrumentation of the hot paths of the package.
+
+Nothing is wrapped until instrumentation is enabled: enable replaces the
+listed functions and methods with timed wrappers and disable puts the
+originals back, so there is no cost when it is off. Each call records its
+duration, the rows and columns of the data it returned or worked on and,
+optionally, the bytes it allocated.
+"""
+from collections import namedtuple
+import functools
+import time
+
+# module:attribute paths of the operations that are timed
+targets = ["epsilon.core:EO.reset",
+           "epsilon.data:Data.__init__",
+           "epsilon.data:Data.materialize",
+           "epsilon._graph:evaluate",
+           "epsilon.model:Model.dep",
+           "epsilon.model:Model._get_exog",
+           "epsilon.model:Model.ols",
+           "epsilon.model:Model._fit",
+           "epsilon.model:Model.preview",
+           "epsilon.model:Model.forecast",
+           "epsilon.model:Model.optimize",
+           "epsilon._ols:partial_regressions",
+           "epsilon._ols:IncrementalOLS.fit",
+           "epsilon._ols:OLSResult.summary",
+           "epsilon._ols:FitResult.summary",
+           "epsilon._parser:read_folder",
+           "epsilon._parser:_read_workbook",
+           "epsilon.plotting:ModelPlots.avm",
+           "epsilon.plotting:ModelPlots.con",
+           "epsilon.plotting:ModelPlots.res",
+           "epsilon.plotting:line",
+           "epsilon.plotting:stackedBarAndLine"]
+
+Record = namedtuple("Record", "name start duration depth rows columns bytes")
+
+records = []
+_patched = []
+# started records whether tracemalloc was started here rather than by the
+# user, so that disable leaves the user's tracing running
+_state = {"depth": 0, "memory": False, "started": False}
+
+
+def _shape(args, result):
+    """rows and columns of the first two dimensional object involved"""
+    for obj in (result,) + tuple(args):
+        shape = getattr(obj, "shape", None)
+        if isinstance(shape, tuple) and len(shape) == 2:
+            return shape
+    return (None, None)
+
+
+def _wrap(func, name):
+    import tracemalloc
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        memory = _state["memory"]
+        if memory:
+            before = tracemalloc.get_traced_memory()[0]
+        depth = _state["depth"]
+        _state["depth"] = depth + 1
+        start = time.perf_counter()
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            _state["depth"] = depth
+            allocated = None
+            if memory:
+                allocated = tracemalloc.get_traced_memory()[0] - before
+            rows, columns = _shape(args, result)
+            records.append(Record(name, start, duration, depth, rows,
+                                  columns, allocated))
+    wrapper._original = func
+    return wrapper
+
+
+def _resolve(target):
+    """the object owning a target and the attribute name"""
+    import importlib
+    module, path = target.split(":")
+    owner = importlib.import_module(module)
+    parts = path.split(".")
+    for part in parts[:-1]:
+        owner = getattr(owner, part)
+    return owner, parts[-1]
+
+
+def enabled():
+    return _patched != []
+
+
+def enable(memory=False):
+    """
+    Start timing the operations in targets
+
+    Parameters
+    ----------
+    memory : Boolean, default False
+            also record the bytes allocated by each call with tracemalloc,
+            which slows every allocation down while enabled
+    """
+    import tracemalloc
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state["started"] = True
+    _state["memory"] = memory
+    if enabled():
+        return
+    for target in targets:
+        owner, attr = _resolve(target)
+        original = owner.__dict__[attr]
+        setattr(owner, attr, _wrap(original, target.split(":")[1]))
+        _patched.append((owner, attr, original))
+
+
+def disable():
+    """Stop timing and restore the original functions"""
+    import tracemalloc
+    while _patched:
+        owner, attr, original = _patched.pop()
+        setattr(owner, attr, original)
+    if _state["started"] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _state["started"] = False
+    _state["memory"] = False
+
+
+def reset():
+    """Forget the recorded calls"""
+    del records[:]
+
+
+def stats():
+    """
+    Recorded calls summarised per operation
+
+    Returns
+    -------
+    DataFrame
+            calls, total, mean and max seconds, the mean rows and columns
+            and total bytes allocated of each operation, slowest first
+    """
+    from pandas import DataFrame
+    columns = ["calls", "total_s", "mean_s", "max_s", "rows", "columns",
+               "bytes"]
+    if records == []:
+        return DataFrame(columns=columns)
+    df = DataFrame(records, columns=Record._fields)
+    df[["rows", "columns", "bytes"]] = df[["rows", "columns",
+                                           "bytes"]].astype(float)
+    summary = df.groupby("name").agg({"duration": ["count", "sum", "mean",
+                                                   "max"],
+                                      "rows": "mean",
+                                      "columns": "mean",
+                                      "bytes": "sum"})
+    summary.columns = columns
+    return summary.sort_values("total_s", ascending=False)
+
+
+def trace(path):
+    """
+    Write the recorded calls as Chrome trace event JSON, viewable in
+    chrome://tracing or Perfetto
+
+    Parameters
+    ----------
+    path : string
+    """
+    import json
+    import os
+    events = [{"name": x.name, "ph": "X", "ts": x.start * 1e6,
+               "dur": x.duration * 1e6, "pid": os.getpid(), "tid": 0,
+               "args": {"rows": x.rows, "columns": x.columns,
+                        "bytes": x.bytes}}
+              for x in records]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
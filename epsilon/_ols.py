@@ -0,0 +1,750 @@
+"""
+least squares kernels used by the Model object.
+
+These work on plain numpy arrays and compute the same statistics as a
+statsmodels OLS fit in closed form, so that many regressions sharing a design
+matrix can be estimated without refitting each one from scratch. OLSResult
+wraps the output with the attributes of a statsmodels results object that
+the rest of the package relies on.
+"""
+import numpy as np
+
+
+def _basis(X, tol=1e-10):
+    """
+    internal function returning an orthonormal basis for the column space of
+    X from its QR factorisation, falling back to an SVD when X is rank
+    deficient
+    """
+    Q, R = np.linalg.qr(X)
+    d = np.abs(np.diag(R))
+    if d.size and d.min() <= tol * d.max():
+        U, s, _ = np.linalg.svd(X, full_matrices=False)
+        Q = U[:, s > tol * s[0]]
+    return Q
+
+
+def _has_constant(X):
+    """internal function to check for a constant column as statsmodels does"""
+    if X.shape[0] == 0 or X.shape[1] == 0:
+        return False
+    return bool(np.any((np.ptp(X, axis=0) == 0) & (X[0] != 0)))
+
+
+def partial_regressions(X, y, Z, tol=1e-10):
+    """
+    For every column z of Z compute the OLS statistics of z in the regression
+    of y on [X, z] using the Frisch-Waugh theorem: X is factored once and
+    partialled out of y and all candidates with a single matrix multiply.
+
+    Parameters
+    ----------
+    X : array-like, shape (n_obs, k)
+            the current design matrix, including any constant
+    y : array-like, shape (n_obs,)
+            the dependent variable
+    Z : array-like, shape (n_obs, m)
+            the candidate regressors
+    tol : float
+            candidates with less than tol of their variation left after
+            partialling out X are treated as collinear and get a coefficient
+            of zero
+
+    Returns
+    -------
+    dict of ndarray, shape (m,)
+            params, bse, tvalues, pvalues and rsquared_adj of each candidate
+    """
+    from scipy import stats
+
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    Z = np.asarray(Z, dtype=float)
+    nobs = y.shape[0]
+    if X.shape[1] > 0:
+        Q = _basis(X)
+        resid = y - Q.dot(Q.T.dot(y))
+        Z_perp = Z - Q.dot(Q.T.dot(Z))
+    else:
+        Q = X
+        resid = y
+        Z_perp = Z
+    k_constant = int(_has_constant(X))
+    df_resid = nobs - Q.shape[1] - 1
+
+    zz = np.einsum('ij,ij->j', Z_perp, Z_perp)
+    ze = Z_perp.T.dot(resid)
+    collinear = zz <= tol * np.einsum('ij,ij->j', Z, Z)
+    zz = np.where(collinear, np.nan, zz)
+
+    params = ze / zz
+    ssr = resid.dot(resid) - ze * params
+    bse = np.sqrt(ssr / df_resid / zz)
+    tvalues = params / bse
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), df_resid)
+    if k_constant:
+        tss = np.sum((y - y.mean()) ** 2)
+    else:
+        tss = y.dot(y)
+    rsquared = 1 - ssr / tss
+    rsquared_adj = 1 - (nobs - k_constant) / df_resid * (1 - rsquared)
+    params = np.where(collinear, 0, params)
+    return {"params": params,
+            "bse": bse,
+            "tvalues": tvalues,
+            "pvalues": pvalues,
+            "rsquared_adj": rsquared_adj}
+
+
+class IncrementalOLS:
+    """
+    Least squares state that keeps the Cholesky factor R of X'X, so a
+    regressor can be added or dropped with a column update instead of
+    refactoring the whole design.
+
+    Adding a column costs O(nk) for X'z and a triangular solve, dropping one
+    costs O(k^2) Givens rotations. When the factor becomes ill conditioned
+    it is recomputed from X with a QR decomposition.
+
+    Parameters
+    ----------
+    y : array-like or Series, shape (n_obs,)
+            the dependent variable, the index of a Series is kept
+    cond_limit : float, default 1e6
+            estimated condition number of X above which R is refactored
+    """
+
+    def __init__(self, y, cond_limit=1e6):
+        self.index = getattr(y, "index", None)
+        self.y = np.asarray(y, dtype=float)
+        self.names = []
+        self.cond_limit = cond_limit
+        self.refactors = 0
+        self._X = np.empty((self.y.shape[0], 0))
+        self._R = np.empty((0, 0))
+        self._Xy = np.empty(0)
+        self._updated = False
+
+    def add(self, name, z):
+        """append regressor z to the design and update the factor"""
+        from scipy.linalg import solve_triangular
+        z = np.asarray(z, dtype=float)
+        zz = z.dot(z)
+        if self.names:
+            r = solve_triangular(self._R, self._X.T.dot(z), trans='T')
+        else:
+            r = np.empty(0)
+        rho2 = zz - r.dot(r)
+        self._X = np.column_stack([self._X, z])
+        self._Xy = np.append(self._Xy, z.dot(self.y))
+        self.names.append(name)
+        if rho2 <= 1e-10 * zz:
+            self._refactor()
+            return
+        k = len(self.names)
+        R = np.zeros((k, k))
+        R[:-1, :-1] = self._R
+        R[:-1, -1] = r
+        R[-1, -1] = np.sqrt(rho2)
+        self._R = R
+        self._updated = True
+
+    def set_y(self, y):
+        """replace the dependent variable, keeping the factor of the design"""
+        self.y = np.asarray(y, dtype=float)
+        self._Xy = self._X.T.dot(self.y)
+
+    def drop(self, name):
+        """remove a regressor from the design and downdate the factor"""
+        j = self.names.index(name)
+        R = np.delete(self._R, j, axis=1)
+        # restore triangular form by rotating out the subdiagonal
+        for i in range(j, R.shape[1]):
+            a, b = R[i, i], R[i + 1, i]
+            h = np.hypot(a, b)
+            if h == 0:
+                continue
+            c, s = a / h, b / h
+            upper, lower = R[i, i:].copy(), R[i + 1, i:].copy()
+            R[i, i:] = c * upper + s * lower
+            R[i + 1, i:] = c * lower - s * upper
+        self._R = R[:-1]
+        self._X = np.delete(self._X, j, axis=1)
+        self._Xy = np.delete(self._Xy, j)
+        self.names.pop(j)
+        self._updated = True
+
+    def _refactor(self):
+        """recompute the factor from the design matrix"""
+        self._R = np.linalg.qr(self._X, mode='r')
+        self._updated = False
+        self.refactors += 1
+
+    def condition(self):
+        """
+        lower bound estimate of the condition number of X with its columns
+        scaled to unit norm, so that variables measured on very different
+        scales, e.g. spend next to a constant, do not trigger a refactor
+        """
+        if self._R.size == 0:
+            return 1.
+        # the column norms of R are those of X
+        d = np.abs(np.diag(self._R)) / np.linalg.norm(self._R, axis=0)
+        if d.min() == 0:
+            return np.inf
+        return d.max() / d.min()
+
+    def fit(self):
+        """
+        solve for the coefficients from the current factor
+
+        Returns
+        -------
+        dict
+                params, normalized_cov_params, resid and df_resid
+        """
+        from scipy.linalg import solve_triangular
+        X, y = self._X, self.y
+        if self._updated and self.condition() > self.cond_limit:
+            self._refactor()
+        k = X.shape[1]
+        if self.condition() > 1e10:
+            # singular design, match the pinv solution statsmodels uses
+            pinv = np.linalg.pinv(X)
+            params = pinv.dot(y)
+            normalized_cov_params = pinv.dot(pinv.T)
+            rank = np.linalg.matrix_rank(X)
+        else:
+            R = self._R
+            params = solve_triangular(
+                R, solve_triangular(R, self._Xy, trans='T'))
+            R_inv = solve_triangular(R, np.eye(k))
+            normalized_cov_params = R_inv.dot(R_inv.T)
+            rank = k
+        resid = y - X.dot(params)
+        return {"params": params,
+                "normalized_cov_params": normalized_cov_params,
+                "resid": resid,
+                "df_resid": y.shape[0] - rank}
+
+
+def multi_ols(X, Y):
+    """
+    OLS fits of several dependent variables on the same design, factoring
+    X once and solving for every column of Y together
+
+    Parameters
+    ----------
+    X : array-like, shape (n_obs, k)
+    Y : array-like, shape (n_obs, n_targets)
+
+    Returns
+    -------
+    dict
+            params of shape (k, n_targets), normalized_cov_params, resid of
+            shape (n_obs, n_targets) and df_resid
+    """
+    from scipy.linalg import solve_triangular
+    X = np.asarray(X, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    k = X.shape[1]
+    Q, R = np.linalg.qr(X)
+    d = np.abs(np.diag(R))
+    if k and d.min() <= 1e-10 * d.max():
+        # singular design, match the pinv solution statsmodels uses
+        pinv = np.linalg.pinv(X)
+        params = pinv.dot(Y)
+        normalized_cov_params = pinv.dot(pinv.T)
+        rank = np.linalg.matrix_rank(X)
+    else:
+        params = solve_triangular(R, Q.T.dot(Y))
+        R_inv = solve_triangular(R, np.eye(k))
+        normalized_cov_params = R_inv.dot(R_inv.T)
+        rank = k
+    return {"params": params,
+            "normalized_cov_params": normalized_cov_params,
+            "resid": Y - X.dot(params),
+            "df_resid": Y.shape[0] - rank}
+
+
+def recursive_ols(X, y, window=None, min_obs=None, refresh=100):
+    """
+    OLS fits over rolling or expanding windows by recursive least squares.
+    Each window is reached from the last by adding the newest observation
+    and, for rolling windows, dropping the oldest, updating (X'X)^-1 with a
+    rank one Sherman-Morrison update rather than refitting.
+
+    Parameters
+    ----------
+    X : array-like, shape (n_obs, k)
+    y : array-like, shape (n_obs,)
+    window : int, default None
+            observations in each rolling window, None for expanding windows
+            that all start at the first observation
+    min_obs : int, default None
+            observations in the first expanding window, k + 1 by default.
+            Cannot be combined with window
+    refresh : int, default 100
+            recompute (X'X)^-1 directly every refresh windows to stop
+            rounding errors accumulating
+
+    Returns
+    -------
+    dict
+            ends, the position after the last observation of each window,
+            nobs and rsquared of shape (n_windows,) and params, bse and
+            tvalues of shape (n_windows, k)
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, k = X.shape
+    if window is not None and min_obs is not None:
+        raise ValueError("min_obs only applies to expanding windows, "
+                         "give either window or min_obs")
+    if window is not None:
+        min_obs = window
+    elif min_obs is None:
+        min_obs = k + 1
+    if min_obs <= k or min_obs > n:
+        raise ValueError("windows need between {} and {} observations".format(
+            k + 1, n))
+    centered = _has_constant(X)
+    ends = np.arange(min_obs, n + 1)
+    m = len(ends)
+    params = np.empty((m, k))
+    bse = np.empty((m, k))
+    rsquared = np.empty(m)
+    nobs = np.empty(m, dtype=int)
+
+    XtX = X[:min_obs].T.dot(X[:min_obs])
+    Xy = X[:min_obs].T.dot(y[:min_obs])
+    yy = y[:min_obs].dot(y[:min_obs])
+    sy = y[:min_obs].sum()
+    P = None
+
+    def update(P, x, sign):
+        # Sherman-Morrison update of (X'X)^-1 for adding or dropping x
+        if P is None:
+            return None
+        u = P.dot(x)
+        denom = 1 + sign * x.dot(u)
+        if abs(denom) < 1e-10:
+            return None
+        return P - sign * np.outer(u, u) / denom
+
+    for i, end in enumerate(ends):
+        if i > 0:
+            new = end - 1
+            XtX += np.outer(X[new], X[new])
+            Xy += X[new] * y[new]
+            yy += y[new] ** 2
+            sy += y[new]
+            P = update(P, X[new], 1)
+            if window is not None:
+                old = end - 1 - window
+                XtX -= np.outer(X[old], X[old])
+                Xy -= X[old] * y[old]
+                yy -= y[old] ** 2
+                sy -= y[old]
+                P = update(P, X[old], -1)
+        if P is None or i % refresh == 0:
+            P = np.linalg.pinv(XtX)
+            rank = np.linalg.matrix_rank(XtX)
+            if rank < k:
+                # updates are only valid for a full rank design
+                P_next = None
+            else:
+                P_next = P
+        else:
+            P_next = P
+        count = end if window is None else window
+        b = P.dot(Xy)
+        ssr = max(yy - b.dot(Xy), 0)
+        df_resid = count - rank
+        params[i] = b
+        bse[i] = np.sqrt(np.diag(P) * ssr / df_resid)
+        tss = yy - sy ** 2 / count if centered else yy
+        rsquared[i] = 1 - ssr / tss
+        nobs[i] = count
+        P = P_next
+    return {"ends": ends,
+            "nobs": nobs,
+            "rsquared": rsquared,
+            "params": params,
+            "bse": bse,
+            "tvalues": params / bse}
+
+
+def _offset(fixed, fixed_params):
+    """internal function summing the fixed terms of a fit"""
+    if fixed is None:
+        return 0.
+    return fixed.values.dot(fixed_params[fixed.columns].values)
+
+
+def _contributions(exog, params, fixed, fixed_params):
+    """internal function multiplying variables by their coefficients"""
+    from pandas import concat
+    contributions = exog * params.values
+    if fixed is not None:
+        contributions = concat([contributions,
+                                fixed * fixed_params[fixed.columns].values],
+                               axis=1)
+    return contributions
+
+
+class _Design:
+    """the exog and endog arrays a result was estimated from"""
+
+    def __init__(self, exog, endog, exog_names):
+        self.exog = exog
+        self.endog = endog
+        self.exog_names = exog_names
+
+
+class OLSResult:
+    """
+    Lightweight result of an OLS fit exposing the statistics a statsmodels
+    results object provides. The full statsmodels summary is only built when
+    summary is called.
+
+    Parameters
+    ----------
+    exog : DataFrame
+            the design matrix including any constant
+    endog : Series
+            the dependent variable
+    params : array-like
+    normalized_cov_params : array-like
+            (X'X)^-1
+    resid : array-like
+    df_resid : int
+    fixed : DataFrame, default None
+            the variables with fixed coefficients, which were subtracted
+            from the dependent variable as an offset before estimation
+    fixed_params : Series, default None
+            the fixed coefficients
+    """
+
+    def __init__(self, exog, endog, params, normalized_cov_params, resid,
+                 df_resid, fixed=None, fixed_params=None):
+        from pandas import Series
+        from scipy import stats
+
+        self.fixed_params = fixed_params
+        self.offset = _offset(fixed, fixed_params)
+        names = list(exog.columns)
+        self.model = _Design(exog.values, endog.values, names)
+        self.nobs = float(len(endog))
+        self.df_resid = float(df_resid)
+        self.params = Series(params, index=names)
+        self.normalized_cov_params = normalized_cov_params
+        self.resid = Series(resid, index=endog.index)
+        self.fittedvalues = endog - self.resid
+        self.ssr = np.dot(resid, resid)
+        self.scale = self.ssr / self.df_resid
+        self.bse = Series(np.sqrt(np.diag(normalized_cov_params) * self.scale),
+                          index=names)
+        self.tvalues = self.params / self.bse
+        self.pvalues = Series(2 * stats.t.sf(np.abs(self.tvalues),
+                                             self.df_resid), index=names)
+        self.k_constant = int(_has_constant(self.model.exog))
+        # on the same basis as the residuals, after any fixed terms
+        y = endog.values - self.offset
+        if self.k_constant:
+            tss = np.sum((y - y.mean()) ** 2)
+        else:
+            tss = np.dot(y, y)
+        self.rsquared = 1 - self.ssr / tss
+        self.rsquared_adj = 1 - ((self.nobs - self.k_constant) /
+                                 self.df_resid * (1 - self.rsquared))
+        self._exog = exog
+        self._endog = endog
+        self._fixed = fixed
+
+    def predict(self, exog=None):
+        """fitted values, which include any fixed terms, or predictions
+        for a new design matrix, which exclude them"""
+        if exog is None:
+            return np.dot(self.model.exog, self.params.values) + self.offset
+        return np.dot(exog, self.params.values)
+
+    def contributions(self):
+        """each variable multiplied by its coefficient, fixed ones included"""
+        return _contributions(self._exog, self.params, self._fixed,
+                              self.fixed_params)
+
+    def summary(self):
+        """build the statsmodels summary of the fit"""
+        import statsmodels.api as sm
+        return sm.OLS(self._endog - self.offset, self._exog).fit().summary()
+
+
+class MultiOLSResult:
+    """
+    Result of OLS fits of several dependent variables on one design matrix.
+    Statistics are DataFrames with a row per regressor and a column per
+    target, or Series indexed by target. Indexing by a target gives the
+    OLSResult of that target.
+
+    Parameters
+    ----------
+    exog : DataFrame
+            the design matrix including any constant
+    endog : DataFrame
+            the dependent variables
+    params : array-like, shape (k, n_targets)
+    normalized_cov_params : array-like
+            (X'X)^-1, shared by every target
+    resid : array-like, shape (n_obs, n_targets)
+    df_resid : int
+    """
+
+    def __init__(self, exog, endog, params, normalized_cov_params, resid,
+                 df_resid):
+        from pandas import DataFrame, Series
+        from scipy import stats
+
+        names = list(exog.columns)
+        targets = list(endog.columns)
+        self.targets = targets
+        self.nobs = float(len(endog))
+        self.df_resid = float(df_resid)
+        self.normalized_cov_params = normalized_cov_params
+        self.params = DataFrame(params, index=names, columns=targets)
+        self.resid = DataFrame(resid, index=endog.index, columns=targets)
+        self.fittedvalues = endog - self.resid
+        ssr = np.einsum('ij,ij->j', resid, resid)
+        self.scale = Series(ssr / self.df_resid, index=targets)
+        self.bse = DataFrame(np.sqrt(np.outer(np.diag(normalized_cov_params),
+                                              self.scale.values)),
+                             index=names, columns=targets)
+        self.tvalues = self.params / self.bse
+        self.pvalues = DataFrame(2 * stats.t.sf(np.abs(self.tvalues.values),
+                                                self.df_resid),
+                                 index=names, columns=targets)
+        self.k_constant = int(_has_constant(exog.values))
+        Y = endog.values
+        if self.k_constant:
+            tss = np.sum((Y - Y.mean(axis=0)) ** 2, axis=0)
+        else:
+            tss = np.einsum('ij,ij->j', Y, Y)
+        self.rsquared = Series(1 - ssr / tss, index=targets)
+        self.rsquared_adj = 1 - ((self.nobs - self.k_constant) /
+                                 self.df_resid * (1 - self.rsquared))
+        self._exog = exog
+        self._endog = endog
+
+    def __getitem__(self, target):
+        j = self.targets.index(target)
+        return OLSResult(self._exog, self._endog[target],
+                         self.params.values[:, j],
+                         self.normalized_cov_params,
+                         self.resid.values[:, j], self.df_resid)
+
+    def predict(self, exog=None):
+        """fitted values of every target, or predictions for a new design"""
+        if exog is None:
+            exog = self._exog.values
+        return np.dot(exog, self.params.values)
+
+    def summary(self):
+        """coefficients, t-stats and adjusted R-squared of every target"""
+        from pandas import concat
+        table = concat([self.params.T, self.tvalues.T], axis=1,
+                       keys=["coefficient", "t-stat"])
+        table[("fit", "rsquared_adj")] = self.rsquared_adj
+        return table
+
+
+class FitResult:
+    """
+    Lightweight view of a statsmodels fit holding the statistics the
+    package uses. The summary, with its text tables and diagnostics, is only
+    built when summary is called. Other attributes are looked up on the
+    underlying fit.
+
+    Parameters
+    ----------
+    fit : statsmodels results object
+    fixed : DataFrame, default None
+            see OLSResult
+    fixed_params : Series, default None
+    """
+
+    def __init__(self, fit, fixed=None, fixed_params=None):
+        self._fit = fit
+        self._fixed = fixed
+        self.fixed_params = fixed_params
+        self.offset = _offset(fixed, fixed_params)
+        self.fittedvalues = fit.fittedvalues + self.offset
+        self.params = fit.params
+        self.bse = fit.bse
+        self.tvalues = fit.tvalues
+        self.pvalues = fit.pvalues
+        self.rsquared_adj = getattr(fit, "rsquared_adj", None)
+        self.resid = fit.resid
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "_fit":
+            raise AttributeError(name)
+        return getattr(self._fit, name)
+
+    def predict(self, exog=None):
+        """fitted values, which include any fixed terms, or predictions
+        for a new design matrix, which exclude them"""
+        if exog is None:
+            return np.asarray(self.fittedvalues)
+        return self._fit.predict(exog)
+
+    def contributions(self):
+        """each variable multiplied by its coefficient, fixed ones included"""
+        from pandas import DataFrame
+        exog = DataFrame(self._fit.model.exog, index=self.resid.index,
+                         columns=self._fit.model.exog_names)
+        return _contributions(exog, self.params, self._fixed,
+                              self.fixed_params)
+
+    def summary(self):
+        """build the statsmodels summary of the fit"""
+        return self._fit.summary()
+
+
+class LazySummary:
+    """
+    Summary of a fit that is only built when it is displayed or printed
+
+    Parameters
+    ----------
+    build : function
+            returns the summary, called at most once
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._summary = None
+
+    def summary(self):
+        """the summary, built on first use"""
+        if self._summary is None:
+            self._summary = self._build()
+        return self._summary
+
+    def __getattr__(self, name):
+        if name.startswith("__") or name in ("_build", "_summary"):
+            raise AttributeError(name)
+        return getattr(self.summary(), name)
+
+    def __str__(self):
+        return str(self.summary())
+
+    def __repr__(self):
+        return str(self.summary())
+
+    def _repr_html_(self):
+        return self.summary()._repr_html_()
+
+
+def batched_ols(X, y, mask=None, centered=True, absorbed=0):
+    """
+    OLS fits of many units sharing a specification, solved together from
+    stacked normal equations with one batched pseudo inverse.
+
+    Parameters
+    ----------
+    X : array-like, shape (n_units, n_obs, k)
+    y : array-like, shape (n_units, n_obs)
+    mask : array-like of bool, shape (n_units, n_obs), default None
+            observations to use, all by default
+    centered : Boolean, default True
+            compute the R-squared about the mean, for models with a constant
+            or demeaned data
+    absorbed : int, default 0
+            degrees of freedom used by effects removed before the fit, e.g.
+            the unit means in a fixed effects model
+
+    Returns
+    -------
+    dict of ndarray
+            params, bse, tvalues and pvalues of shape (n_units, k), rsquared,
+            nobs and df_resid of shape (n_units,) and resid of shape
+            (n_units, n_obs)
+    """
+    from scipy import stats
+
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if mask is None:
+        mask = np.ones(y.shape, dtype=bool)
+    X = np.where(mask[..., None], X, 0)
+    y = np.where(mask, y, 0)
+
+    XtX = np.einsum('unk,unl->ukl', X, X)
+    Xty = np.einsum('unk,un->uk', X, y)
+    # equilibrate the columns so that regressors on very different scales
+    # do not make the normal equations ill conditioned
+    diag = np.einsum('ukk->uk', XtX)
+    d = 1 / np.sqrt(np.where(diag > 0, diag, 1))
+    equilibrate = d[:, :, None] * d[:, None, :]
+    normalized_cov_params = (np.linalg.pinv(XtX * equilibrate, rcond=1e-12) *
+                             equilibrate)
+    rank = np.linalg.matrix_rank(XtX * equilibrate)
+    params = np.einsum('ukl,ul->uk', normalized_cov_params, Xty)
+    resid = y - np.einsum('unk,uk->un', X, params)
+
+    nobs = mask.sum(axis=1)
+    df_resid = nobs - rank - absorbed
+    ssr = np.einsum('un,un->u', resid, resid)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = ssr / df_resid
+        bse = np.sqrt(np.einsum('ukk->uk', normalized_cov_params) *
+                      scale[:, None])
+        tvalues = params / bse
+        if centered:
+            mean = y.sum(axis=1) / nobs
+            tss = (np.where(mask, y - mean[:, None], 0) ** 2).sum(axis=1)
+        else:
+            tss = np.einsum('un,un->u', y, y)
+        rsquared = 1 - ssr / tss
+    pvalues = 2 * stats.t.sf(np.abs(tvalues), df_resid[:, None])
+    return {"params": params,
+            "bse": bse,
+            "tvalues": tvalues,
+            "pvalues": pvalues,
+            "rsquared": rsquared,
+            "nobs": nobs,
+            "df_resid": df_resid,
+            "resid": resid}
+
+
+def within(X, y, mask=None):
+    """
+    Subtract the mean of each unit from its observations, the within
+    transformation of a fixed effects model
+
+    Parameters
+    ----------
+    X : array-like, shape (n_units, n_obs, k)
+    y : array-like, shape (n_units, n_obs)
+    mask : array-like of bool, shape (n_units, n_obs), default None
+            observations to use, all by default. Means are taken over these
+            and other observations are set to zero
+
+    Returns
+    -------
+    X, y, X_mean, y_mean
+            the demeaned arrays and the unit means of shape (n_units, k) and
+            (n_units,)
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if mask is None:
+        mask = np.ones(y.shape, dtype=bool)
+    nobs = np.maximum(mask.sum(axis=1), 1)
+    X = np.where(mask[..., None], X, 0)
+    y = np.where(mask, y, 0)
+    X_mean = X.sum(axis=1) / nobs[:, None]
+    y_mean = y.sum(axis=1) / nobs
+    X = np.where(mask[..., None], X - X_mean[:, None, :], 0)
+    y = np.where(mask, y - y_mean[:, None], 0)
+    return X, y, X_mean, y_mean
@@ -3,10 +3,140 @@ def read(df):
     from epsilon.core import EO
     return EO(df)
 
-def read_folder(folderpath, sheetname='output', header=0, check_date_format=False, date_format="w-sat"):
+def _read_workbook(file, sheetname, header):
+    """reads the output sheet of a single workbook"""
+    import pandas as pd
+    return pd.read_excel(file,
+                         sheetname=sheetname,
+                         header=header,
+                         index_col=0)
+
+
+def _file_hash(path):
+    """content hash of a file"""
+    import hashlib
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_dir(folderpath):
+    """
+    default folder for the fragments of the workbooks in folderpath, in the
+    user's cache rather than next to the data
+    """
+    import os
+    import hashlib
+    root = os.environ.get("XDG_CACHE_HOME",
+                          os.path.join(os.path.expanduser("~"), ".cache"))
+    key = hashlib.sha1(os.path.abspath(folderpath).encode()).hexdigest()
+    return os.path.join(root, "epsilon", "workbooks", key)
+
+
+class _FragmentCache:
+    """
+    manifest of the workbooks in a folder, recording the path, modification
+    time, size and content hash of each, with the parsed output sheet stored
+    as a parquet fragment in path
+    """
+
+    def __init__(self, path, sheetname, header):
+        import os
+        import json
+        self.path = path
+        self.options = repr((sheetname, header))
+        self.manifest = {}
+        self.changed = False
+        manifest = os.path.join(self.path, "manifest.json")
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                self.manifest = json.load(f)
+
+    def _fragment(self, digest):
+        import os
+        return os.path.join(self.path, digest + ".parquet")
+
+    def lookup(self, file):
+        """the cached output sheet of a workbook, or None if it changed"""
+        import os
+        import pyarrow.parquet as pq
+        stat = os.stat(file)
+        entry = self.manifest.get(file)
+        if entry is None or entry["options"] != self.options:
+            return None
+        if (entry["mtime"], entry["size"]) != (stat.st_mtime, stat.st_size):
+            # touched but possibly unchanged, compare the contents
+            if entry["hash"] != _file_hash(file):
+                return None
+            entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+            self.changed = True
+        if not os.path.exists(self._fragment(entry["hash"])):
+            return None
+        return pq.read_table(self._fragment(entry["hash"])).to_pandas()
+
+    def store(self, file, df):
+        """write the parsed output sheet of a workbook to a fragment"""
+        import os
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        stat = os.stat(file)
+        digest = _file_hash(file)
+        pq.write_table(pa.Table.from_pandas(df), self._fragment(digest))
+        self.manifest[file] = {"mtime": stat.st_mtime, "size": stat.st_size,
+                               "hash": digest, "options": self.options}
+        self.changed = True
+
+    def prune(self, files):
+        """forget workbooks that are no longer in the folder"""
+        import os
+        for file in set(self.manifest).difference(files):
+            digest = self.manifest.pop(file)["hash"]
+            if (os.path.exists(self._fragment(digest)) and digest not in
+                    [x["hash"] for x in self.manifest.values()]):
+                os.remove(self._fragment(digest))
+            self.changed = True
+
+    def save(self):
+        import os
+        import json
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        with open(os.path.join(self.path, "manifest.json"), "w") as f:
+            json.dump(self.manifest, f)
+
+
+def read_folder(folderpath, sheetname='output', header=0,
+                check_date_format=False, date_format="w-sat", workers=1,
+                progress=None, cache=True):
     """
     loops through excel files in folder and concatenates output sheets to
     produce a epsilon object
+
+    Workbooks that fail to load are skipped and listed in the load_report
+    attribute of the returned object rather than stopping the load.
+
+    Parameters
+    ----------
+    folderpath : string
+    sheetname : string, default 'output'
+    header : int, default 0
+    check_date_format : Boolean, default False
+    date_format : string, default 'w-sat'
+    workers : int, default 1
+            number of processes to parse workbooks in
+    progress : function, default None
+            called as progress(done, total, file) after each workbook
+    cache : Boolean or string, default True
+            keep each parsed workbook as a parquet fragment, so later calls
+            only parse workbooks that are new or have changed. True keeps
+            them in the user's cache folder, a string names the folder to
+            keep them in. Workbooks whose fragment cannot be written are
+            still loaded, with the reason in the cache_error column of the
+            load_report
     """
     from epsilon.core import EO
     import os
@@ -14,6 +144,7 @@ def read_folder(folderpath, sheetname='output', header=0, check_date_format=Fals
     import fnmatch
     import pyarrow as pa
     import pyarrow.parquet as pq
+    from warnings import warn
 
     date_formats = {
         "w-mon": 0,
@@ -31,20 +162,56 @@ def read_folder(folderpath, sheetname='output', header=0, check_date_format=Fals
         for filename in fnmatch.filter(filenames, '*.xlsx'):
             matches.append(os.path.join(root, filename))
     matches = [x for x in matches if "~" not in x]
-    success = []
 
-    data = []
-    for i, file in enumerate(matches):
-        print("Processing file {0} of ".format(i + 1) +
-              str(len(matches) + 1), end="\r")
-        temp = pd.read_excel(file,
-                             sheetname=sheetname,
-                             header=header,
-                             index_col=0)
-        temp.name = file
-        data.append(temp)
-        success.append(file)
+    loaded = [None] * len(matches)
+    errors = {}
+    cache_errors = {}
+    fragments = None
+    if cache:
+        if cache is True:
+            cache = _cache_dir(folderpath)
+        fragments = _FragmentCache(cache, sheetname, header)
+        fragments.prune(matches)
+        loaded = [fragments.lookup(file) for file in matches]
+    parse = [i for i, temp in enumerate(loaded) if temp is None]
 
+    def _done(i, read):
+        try:
+            loaded[i] = read()
+        except Exception as e:
+            errors[matches[i]] = "{}: {}".format(type(e).__name__, e)
+        else:
+            if fragments is not None:
+                try:
+                    fragments.store(matches[i], loaded[i])
+                except Exception as e:
+                    cache_errors[matches[i]] = "{}: {}".format(
+                        type(e).__name__, e)
+        if progress is not None:
+            progress(len(errors) + sum(x is not None for x in loaded),
+                     len(matches), matches[i])
+
+    if workers > 1 and len(parse) > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = dict((pool.submit(_read_workbook, matches[i],
+                                        sheetname, header), i)
+                           for i in parse)
+            for future in as_completed(futures):
+                _done(futures[future], future.result)
+    else:
+        for i in parse:
+            _done(i, lambda: _read_workbook(matches[i], sheetname, header))
+    if fragments is not None and fragments.changed:
+        fragments.save()
+
+    data = []
+    success = []
+    for file, temp in zip(matches, loaded):
+        if temp is not None:
+            temp.name = file
+            data.append(temp)
+            success.append(file)
 
     if check_date_format:
         for df in data:
@@ -58,8 +225,24 @@ def read_folder(folderpath, sheetname='output', header=0, check_date_format=Fals
                 raise ValueError("dates are not all " +
                                  date_format + " for " + df.name)
     print("successfully loaded the following files " + str(success))
+    report = pd.DataFrame({"file": matches,
+                           "loaded": [x not in errors for x in matches],
+                           "error": [errors.get(x) for x in matches],
+                           "cache_error": [cache_errors.get(x)
+                                           for x in matches]},
+                          columns=["file", "loaded", "error", "cache_error"])
+    if errors:
+        warn("{} workbooks failed to load: {}".format(len(errors),
+                                                      sorted(errors)))
+    if cache_errors:
+        warn("{} workbooks could not be cached: {}".format(
+            len(cache_errors), sorted(cache_errors)))
     df = pd.concat(data, axis=1)
-    table = pa.Table.from_pandas(df)
-    pq.write_table(table, folderpath + '/AllData.parquet')
+    if (fragments is None or fragments.changed or
+            not os.path.exists(folderpath + '/AllData.parquet')):
+        table = pa.Table.from_pandas(df)
+        pq.write_table(table, folderpath + '/AllData.parquet')
 
-    return EO(df)
+    eo = EO(df)
+    eo.load_report = report
+    return eo
@@ -0,0 +1,348 @@
+"""
+replay of recorded transformations on scenario inputs.
+
+A scenario replaces the values of some raw variables, e.g. the spend of
+each media channel, over a run of weeks. Every regressor made from those
+variables is recomputed by replaying its recipes from the transformation
+graph with the array kernels, treating the scenarios as columns of one
+block, so thousands of scenarios are evaluated together without building
+a DataFrame per scenario. Regressors that do not depend on the scenario
+inputs keep their historical values. The same replay, run backwards,
+gives the exact gradient of the prediction with respect to the inputs, which
+the budget allocation uses.
+"""
+import numpy as np
+
+
+def _filter(block, rate):
+    """
+    internal function applying the recursive filter of adstock down the
+    columns of a block. Narrow blocks, such as the single plans of the
+    allocation, are filtered in C by lfilter, as the kernel's python loop
+    over observations only pays off across many columns
+    """
+    if block.shape[1] > 100:
+        from epsilon._transforms import recursive_filter
+        return recursive_filter(block, rate)[:, 0, :].T
+    from scipy.signal import lfilter
+    return lfilter([1.], [1., -rate], block, axis=0)
+
+
+def _depends(graph, name, inputs):
+    """internal function checking whether name is made from the inputs"""
+    if name in inputs:
+        return True
+    if name not in graph.recipes:
+        return False
+    return any(_depends(graph, x, inputs)
+               for x in graph.recipes[name].sources)
+
+
+def replay(graph, name, fetch, inputs, cache=None):
+    """
+    values of a variable computed from scenario inputs
+
+    Parameters
+    ----------
+    graph : TransformGraph
+    name : string
+    fetch : function
+            fetch(name, fill) returns the historical values of a variable,
+            as Data._fetch
+    inputs : dict of name: ndarray, shape (n_obs, n_scenarios)
+            the values of the raw variables in every scenario
+    cache : dict, default None
+            values already replayed, shared between calls
+
+    Returns
+    -------
+    ndarray, shape (n_obs, n_scenarios) or (n_obs, 1)
+            one column when the variable does not depend on the inputs
+    """
+    from epsilon._graph import _ops
+
+    if cache is None:
+        cache = {}
+    if name in cache:
+        return cache[name]
+    if name in inputs:
+        out = inputs[name]
+    elif not _depends(graph, name, inputs):
+        out = fetch(name, True)[:, None]
+    else:
+        recipe = graph.recipes[name]
+        if recipe.op == "mult":
+            out = (replay(graph, recipe.sources[0], fetch, inputs, cache) *
+                   replay(graph, recipe.sources[1], fetch, inputs, cache))
+        else:
+            source = recipe.sources[0]
+            block = replay(graph, source, fetch, inputs, cache)
+            kwargs = dict(recipe.kwargs)
+            if recipe.op == "saturate" and kwargs.get("scale", True):
+                # keep the scaling the model was estimated with, the maximum
+                # of the historical values
+                block = block / fetch(source, True).max()
+                kwargs["scale"] = False
+            if recipe.op == "filter":
+                out = _filter(block, recipe.param)
+            else:
+                out = _ops[recipe.op](block, [recipe.param],
+                                      **kwargs)[:, 0, :]
+    cache[name] = out
+    return out
+
+
+def _check_channels(graph, params, channels):
+    """internal function rejecting channels no fitted variable is made from"""
+    names = [x for x in params.index if x != "const"]
+    unused = [x for x in channels
+              if not any(_depends(graph, name, {x: None}) for name in names)]
+    if unused:
+        raise ValueError("{} do not enter any variable of the model"
+                         .format(unused))
+
+
+def _inputs(fetch, channels, scenarios, start):
+    """internal function making the input blocks of the scenario channels"""
+    n_scenarios, n_weeks, n_channels = scenarios.shape
+    if n_channels != len(channels):
+        raise ValueError("scenarios have {} channels but {} were named"
+                         .format(n_channels, len(channels)))
+    inputs = {}
+    for i, channel in enumerate(channels):
+        history = fetch(channel, True)
+        if start < 0 or start + n_weeks > len(history):
+            raise ValueError("scenario weeks must be within the data")
+        block = np.repeat(history[:, None], n_scenarios, axis=1)
+        block[start:start + n_weeks] = scenarios[:, :, i].T
+        inputs[channel] = block
+    return inputs
+
+
+def simulate(graph, fetch, params, channels, scenarios, start):
+    """
+    predictions of a linear model for every scenario
+
+    Parameters
+    ----------
+    graph : TransformGraph
+    fetch : function
+            see replay
+    params : Series
+            coefficients by regressor name, 'const' for the constant
+    channels : list
+            the raw variables the scenarios set
+    scenarios : array-like, shape (n_scenarios, n_weeks, n_channels)
+    start : int
+            position of the first scenario week in the data
+
+    Returns
+    -------
+    ndarray, shape (n_obs - start, n_scenarios)
+            predictions from the first scenario week to the end of the data,
+            which includes the carryover of the scenarios into later weeks
+    """
+    _check_channels(graph, params, channels)
+    scenarios = np.asarray(scenarios, dtype=float)
+    n_scenarios = scenarios.shape[0]
+    inputs = _inputs(fetch, channels, scenarios, start)
+    cache = {}
+    prediction = np.zeros((len(fetch(channels[0], True)) - start, 1))
+    for name, coefficient in params.items():
+        if name == "const":
+            prediction = prediction + coefficient
+            continue
+        values = replay(graph, name, fetch, inputs, cache)
+        prediction = prediction + coefficient * values[start:]
+    return np.broadcast_to(prediction,
+                           (prediction.shape[0], n_scenarios)).copy()
+
+
+def gradient(graph, fetch, params, channels, plan, start):
+    """
+    predicted total of a linear model from the first plan week to the end of
+    the data, and its gradient with respect to the plan.
+
+    The gradient is exact: it is propagated back through the recipes of
+    every regressor, with the slope of each saturation curve, the carryover
+    of each filter run backwards in time and the lags of each shift undone.
+
+    Parameters
+    ----------
+    graph : TransformGraph
+    fetch : function
+            see replay
+    params : Series
+    channels : list
+    plan : array-like, shape (n_weeks, n_channels)
+    start : int
+
+    Returns
+    -------
+    total : float
+    grad : ndarray, shape (n_weeks, n_channels)
+    """
+    from epsilon._transforms import saturate_slope, shift
+
+    plan = np.asarray(plan, dtype=float)
+    inputs = _inputs(fetch, channels, plan[None], start)
+    cache = {}
+    n_obs = len(inputs[channels[0]])
+    total = 0.
+    adjoint = {}
+    for name, coefficient in params.items():
+        if name == "const":
+            total += coefficient * (n_obs - start)
+            continue
+        values = replay(graph, name, fetch, inputs, cache)
+        total += coefficient * values[start:].sum()
+        if _depends(graph, name, inputs):
+            seed = np.zeros((n_obs, 1))
+            seed[start:] = coefficient
+            adjoint[name] = adjoint.get(name, 0) + seed
+
+    # variables made from the inputs, each after every variable made from it
+    order = []
+    seen = set()
+
+    def visit(name):
+        if name in seen or name in inputs:
+            return
+        seen.add(name)
+        for source in graph.recipes[name].sources:
+            if _depends(graph, source, inputs):
+                visit(source)
+        order.append(name)
+    for name in list(adjoint):
+        visit(name)
+
+    for name in reversed(order):
+        g = adjoint.pop(name)
+        recipe = graph.recipes[name]
+        if recipe.op == "mult":
+            first, second = recipe.sources
+            back = [(first, g * cache[second]), (second, g * cache[first])]
+        else:
+            source = recipe.sources[0]
+            kwargs = recipe.kwargs
+            if recipe.op == "filter":
+                back = [(source, _filter(g[::-1], recipe.param)[::-1])]
+            elif recipe.op == "shift":
+                back = [(source, shift(g, -recipe.param)[:, 0, :])]
+            else:
+                divisor = 1.
+                if kwargs.get("scale", True):
+                    divisor = fetch(source, True).max()
+                slope = saturate_slope(cache[source] / divisor, recipe.param,
+                                       kwargs["curve"],
+                                       kwargs.get("shape", 1.0))[:, 0, :]
+                back = [(source, g * slope / divisor)]
+        for source, value in back:
+            if _depends(graph, source, inputs):
+                adjoint[source] = adjoint.get(source, 0) + value
+
+    n_weeks = plan.shape[0]
+    grad = np.zeros(plan.shape)
+    for i, channel in enumerate(channels):
+        if channel in adjoint:
+            grad[:, i] = adjoint[channel][start:start + n_weeks, 0]
+    return total, grad
+
+
+def allocate(graph, fetch, params, channels, budgets, start, phasing,
+             bounds=None):
+    """
+    allocations of each budget across channels maximising the predicted
+    total, solved with SLSQP using the exact gradient. Each budget is solved
+    starting from the shares of the previous solution, so sweeping a range
+    of budgets takes few iterations per budget.
+
+    Parameters
+    ----------
+    graph : TransformGraph
+    fetch : function
+            see replay
+    params : Series
+    channels : list
+    budgets : list of float
+            non-negative, a budget of zero allocates nothing
+    start : int
+    phasing : ndarray, shape (n_weeks, n_channels)
+            how the total of each channel is spread over the plan weeks,
+            each column summing to one
+    bounds : list of (min, max) pairs, default None
+            limits on the total of each channel, None for no limit
+
+    Returns
+    -------
+    totals : ndarray, shape (n_budgets, n_channels)
+    contributions : ndarray, shape (n_budgets,)
+            the predicted total less the predicted total with no spend in
+            the plan weeks
+    iterations : list of int
+    """
+    import warnings
+    from scipy.optimize import minimize
+
+    _check_channels(graph, params, channels)
+    n_channels = len(channels)
+    if bounds is None:
+        bounds = [(None, None)] * n_channels
+    history = {}
+
+    def fetched(name, fill=True):
+        # the historical values do not change between evaluations
+        if (name, fill) not in history:
+            history[name, fill] = fetch(name, fill)
+        return history[name, fill]
+
+    def evaluate(totals):
+        total, grad = gradient(graph, fetched, params, channels,
+                               phasing * totals, start)
+        return total, (grad * phasing).sum(axis=0)
+
+    zero = evaluate(np.zeros(n_channels))[0]
+    constraint = {"type": "eq", "fun": lambda x: x.sum() - 1,
+                  "jac": lambda x: np.ones_like(x)}
+    shares = np.full(n_channels, 1. / n_channels)
+    totals, contributions, iterations = [], [], []
+    for budget in budgets:
+        if budget < 0:
+            raise ValueError("budgets cannot be negative, got {}".format(
+                budget))
+        if budget == 0:
+            # nothing to allocate, which only meets bounds without a minimum
+            if any(x is not None and x > 0 for x, _ in bounds):
+                raise ValueError("the channel bounds cannot be met with a "
+                                 "budget of 0")
+            totals.append(np.zeros(n_channels))
+            contributions.append(0.)
+            iterations.append(0)
+            continue
+        lower = np.array([0 if x is None else x for x, _ in bounds]) / budget
+        upper = np.array([budget if x is None else min(x, budget)
+                          for _, x in bounds]) / budget
+        if lower.sum() > 1 + 1e-12 or upper.sum() < 1 - 1e-12:
+            raise ValueError("the channel bounds cannot be met with a "
+                             "budget of {}".format(budget))
+        # work in shares of the budget and a contribution of order one
+        norm = abs(evaluate(budget * np.clip(shares, lower, upper))[0] -
+                   zero) or 1.
+
+        def objective(x):
+            total, grad = evaluate(budget * x)
+            return -(total - zero) / norm, -grad * budget / norm
+
+        result = minimize(objective, np.clip(shares, lower, upper),
+                          jac=True, method="SLSQP",
+                          bounds=list(zip(lower, upper)),
+                          constraints=[constraint],
+                          options={"ftol": 1e-10, "maxiter": 500})
+        if not result.success:
+            warnings.warn("the allocation of a budget of {} did not "
+                          "converge: {}".format(budget, result.message))
+        shares = result.x
+        totals.append(budget * shares)
+        contributions.append(-result.fun * norm)
+        iterations.append(result.get("nit", 0))
+    return np.array(totals), np.array(contributions), iterations
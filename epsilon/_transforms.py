@@ -0,0 +1,199 @@
+"""
+array kernels behind the transformation methods on the Data object.
+
+The kernels work on plain numpy arrays so that a whole block of variables can
+be transformed for a whole vector of parameters in a single pass, rather than
+once per variable per parameter.
+"""
+import numpy as np
+
+
+def recursive_filter(block, rates, dtype=np.float64):
+    """
+    Apply the first order recursive filter ``y[t] = rate * y[t-1] + x[t]``
+    to every column of a block for every rate. This is the carryover used by
+    adstock and decay transformations.
+
+    Parameters
+    ----------
+    block : array-like, shape (n_obs, n_vars) or (n_obs,)
+            the variables to filter, observations along the first axis
+    rates : float or array-like, shape (n_rates,)
+            the proportion of the previous period carried into the next
+    dtype : numpy dtype, default float64
+            precision of the computation and the output, e.g. np.float32
+
+    Returns
+    -------
+    ndarray, shape (n_vars, n_rates, n_obs)
+    """
+    x = np.asarray(block, dtype=dtype)
+    if x.ndim == 1:
+        x = x[:, None]
+    rates = np.atleast_1d(np.asarray(rates, dtype=dtype))
+    n_obs, n_vars = x.shape
+    # time-major buffer so each step writes one contiguous (vars, rates) slab
+    out = np.empty((n_obs, n_vars, rates.size), dtype=dtype)
+    if n_obs > 0:
+        out[0] = x[0][:, None]
+    for t in range(1, n_obs):
+        np.multiply(out[t - 1], rates, out=out[t])
+        out[t] += x[t][:, None]
+    return out.transpose(1, 2, 0)
+
+
+def _atan(x, alpha, shape, out):
+    np.divide(x, alpha, out=out)
+    np.arctan(out, out=out)
+    out /= np.pi/2
+    return out
+
+
+def _atansq(x, alpha, shape, out):
+    np.divide(x, alpha, out=out)
+    np.arctan(out, out=out)
+    np.square(out, out=out)
+    out /= np.pi/2
+    return out
+
+
+def _pow(x, alpha, shape, out):
+    return np.power(x, alpha, out=out)
+
+
+def _hill(x, alpha, shape, out):
+    np.power(x, shape, out=out)
+    out /= out + np.power(alpha, shape)
+    return out
+
+
+_curves = {'atan': _atan,
+           'atansq': _atansq,
+           'pow': _pow,
+           'hill': _hill}
+
+
+def saturate(block, alphas, curve, scale=True, shape=1.0, dtype=np.float64):
+    """
+    Apply a saturation curve to every column of a block for every alpha in a
+    single broadcast expression.
+
+    Parameters
+    ----------
+    block : array-like, shape (n_obs, n_vars) or (n_obs,)
+            the variables to transform, observations along the first axis
+    alphas : float or array-like, shape (n_alphas,)
+            curve parameter; the divisor for atan/atansq, the power for pow
+            and the half saturation point for hill
+    curve : string
+            one of 'atan', 'atansq', 'pow' or 'hill'
+    scale : Boolean, default True
+            divide each column by its maximum before applying the curve
+    shape : float, default 1.0
+            steepness of the hill curve, ignored by the other curves
+    dtype : numpy dtype, default float64
+
+    Returns
+    -------
+    ndarray, shape (n_obs, n_alphas, n_vars)
+    """
+    if curve not in _curves:
+        raise ValueError("{} is not a recognised curve, choose from {}"
+                         .format(curve, sorted(_curves)))
+    x = np.asarray(block, dtype=dtype)
+    if x.ndim == 1:
+        x = x[:, None]
+    if scale:
+        x = x / x.max(axis=0)
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=dtype))
+    out = np.empty((x.shape[0], alphas.size, x.shape[1]), dtype=dtype)
+    return _curves[curve](x[:, None, :], alphas[None, :, None], shape, out)
+
+
+def _atan_slope(x, alpha, shape):
+    return 1 / (alpha * (1 + np.square(x / alpha))) / (np.pi/2)
+
+
+def _atansq_slope(x, alpha, shape):
+    return 2 * np.arctan(x / alpha) * _atan_slope(x, alpha, shape)
+
+
+def _pow_slope(x, alpha, shape):
+    # the slope of a concave power is unbounded at zero, use a small value
+    return alpha * np.power(np.maximum(x, 1e-12), alpha - 1)
+
+
+def _hill_slope(x, alpha, shape):
+    x = np.maximum(x, 1e-12)
+    xs = np.power(x, shape)
+    a = np.power(alpha, shape)
+    return shape * xs / x * a / np.square(xs + a)
+
+
+_slopes = {'atan': _atan_slope,
+           'atansq': _atansq_slope,
+           'pow': _pow_slope,
+           'hill': _hill_slope}
+
+
+def saturate_slope(block, alphas, curve, shape=1.0, dtype=np.float64):
+    """
+    Derivative of a saturation curve with respect to its input, for every
+    column of a block and every alpha. The block is used as is, divide it by
+    the scaling of saturate first where that applies.
+
+    Parameters
+    ----------
+    block : array-like, shape (n_obs, n_vars) or (n_obs,)
+    alphas : float or array-like, shape (n_alphas,)
+    curve : string
+            one of 'atan', 'atansq', 'pow' or 'hill'
+    shape : float, default 1.0
+    dtype : numpy dtype, default float64
+
+    Returns
+    -------
+    ndarray, shape (n_obs, n_alphas, n_vars)
+    """
+    if curve not in _slopes:
+        raise ValueError("{} is not a recognised curve, choose from {}"
+                         .format(curve, sorted(_slopes)))
+    x = np.asarray(block, dtype=dtype)
+    if x.ndim == 1:
+        x = x[:, None]
+    alphas = np.atleast_1d(np.asarray(alphas, dtype=dtype))
+    return _slopes[curve](x[:, None, :], alphas[None, :, None], shape)
+
+
+def shift(block, lags, fill=0, dtype=np.float64):
+    """
+    Shift every column of a block by every lag, filling the periods shifted
+    in from outside the data. Positive lags look backwards, negative lags
+    look forwards.
+
+    Parameters
+    ----------
+    block : array-like, shape (n_obs, n_vars) or (n_obs,)
+    lags : int or array-like, shape (n_lags,)
+    fill : float, default 0
+            value for the periods without data
+    dtype : numpy dtype, default float64
+
+    Returns
+    -------
+    ndarray, shape (n_obs, n_lags, n_vars)
+    """
+    x = np.asarray(block, dtype=dtype)
+    if x.ndim == 1:
+        x = x[:, None]
+    lags = np.atleast_1d(lags)
+    n_obs = x.shape[0]
+    out = np.full((n_obs, lags.size, x.shape[1]), fill, dtype=dtype)
+    for j, lag in enumerate(lags):
+        if lag == 0:
+            out[:, j] = x
+        elif 0 < lag < n_obs:
+            out[lag:, j] = x[:-lag]
+        elif -n_obs < lag < 0:
+            out[:lag, j] = x[-lag:]
+    return out
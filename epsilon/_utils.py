@@ -28,20 +28,70 @@ def convert_categoricals(data):
         lambda x: x.astype('category'))
 
 
-def has_variation(data):
+def column_stats(data, nunique=True):
     """
-    Calculates whether a variable has any variation across the dataset
+    Computes a table of statistics of every column in one vectorized pass
+    over the numeric columns: dtype, whether it is numeric, std, min, max,
+    number of nulls, number of unique values and whether the column varies
+    across the dataset
+
+    Parameters
+    ----------
+    data : DataFrame
+    nunique : Boolean, default True
+            count the unique values, which sorts every column. If False the
+            counts are left missing
     """
     import numpy as np
     import pandas as pd
 
-    numeric_data = data.select_dtypes(include=[np.number])
-    categorical_data = data.select_dtypes(exclude=[np.number])
-    numeric_hasvariation = numeric_data.ix[:, numeric_data.std() != 0]
-    numeric_hasvariation = pd.DataFrame(numeric_hasvariation)
-    categorical_hasvariation = categorical_data.ix[:, categorical_data.apply(
-        lambda x: len(set(x)) > 1)]
-    categorical_hasvariation = pd.DataFrame(categorical_hasvariation)
-    data_hasvariation = pd.concat([numeric_hasvariation,
-                                   categorical_hasvariation], axis=1)
-    return data_hasvariation
+    numeric = data.select_dtypes(include=[np.number])
+    with np.errstate(invalid="ignore"):
+        std = numeric.std()
+    stats = pd.DataFrame({"std": std.values,
+                          "min": numeric.min().values,
+                          "max": numeric.max().values,
+                          "nulls": numeric.isnull().sum().values,
+                          "nunique": np.nan},
+                         index=numeric.columns)
+    if nunique and len(numeric.columns):
+        ordered = np.sort(numeric.values.astype(float), axis=0)
+        # nans sort last, so a column has values if its first sorted value
+        # does
+        valid = ~np.isnan(ordered)
+        stats["nunique"] = valid[:1].sum(axis=0) + (
+            (np.diff(ordered, axis=0) != 0) & valid[1:]).sum(axis=0)
+    # a constant column has a std of zero, columns with fewer than two
+    # values have no std and are kept as the variation check always has
+    stats["varying"] = ~(stats["std"] == 0)
+
+    numeric_columns = set(numeric.columns)
+    other = data[[x for x in data.columns if x not in numeric_columns]]
+    if len(other.columns):
+        rows = pd.DataFrame({"nulls": other.isnull().sum(),
+                             "nunique": np.nan,
+                             "varying": other.nunique(dropna=False) > 1},
+                            index=other.columns)
+        if nunique:
+            rows["nunique"] = other.nunique()
+        stats = pd.concat([stats, rows])
+    stats = stats.reindex(data.columns)
+    stats.insert(0, "dtype", data.dtypes)
+    stats.insert(1, "numeric", [x in numeric_columns for x in data.columns])
+    stats["nulls"] = stats["nulls"].astype(int)
+    if nunique:
+        stats["nunique"] = stats["nunique"].astype(int)
+    stats["varying"] = stats["varying"].astype(bool)
+    return stats
+
+
+def has_variation(data):
+    """
+    Calculates whether a variable has any variation across the dataset, using
+    the column statistics of a Data object where available
+    """
+    if hasattr(data, "profile"):
+        stats = data.profile(nunique=False)
+    else:
+        stats = column_stats(data)
+    return data[stats.index[stats["varying"]].tolist()]
@@ -0,0 +1,149 @@
+"""
+memoization of transformed variables.
+
+Transformed variables are cached by a hash of the values of their source
+variables together with the transformation and its parameters, so that
+recreating a transformation, e.g. after a reset or in a new model, reuses the
+earlier result. The cache evicts the least recently used results once it
+exceeds its byte budget, optionally spilling them to disk.
+
+Examples
+--------
+>>> import epsilon.cache
+>>> epsilon.cache.configure(max_bytes=2**30, spill=True)
+>>> epsilon.cache.stats()
+"""
+from collections import OrderedDict
+import hashlib
+import os
+import numpy as np
+
+
+class TransformCache:
+    """
+    Least recently used cache of transformed variables under a byte budget
+
+    Parameters
+    ----------
+    max_bytes : int, default 256MB
+            memory budget for cached arrays, 0 disables the cache
+    spill_dir : string, default None
+            folder to write evicted arrays to instead of discarding them
+    """
+
+    def __init__(self, max_bytes=2**28, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.spill_dir = spill_dir
+        self.nbytes = 0
+        self._store = OrderedDict()
+        self._counts = dict.fromkeys(
+            ["hits", "misses", "evictions", "spills", "disk_hits"], 0)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def digest(values):
+        """content hash of an array"""
+        values = np.ascontiguousarray(values)
+        h = hashlib.sha1(values.tobytes())
+        h.update(str((values.dtype.str, values.shape)).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def key(digests, op, param, static):
+        """cache key of a transformation of sources with the given digests"""
+        spec = repr((tuple(digests), op, param, static))
+        return hashlib.sha1(spec.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, key + ".npy")
+
+    def get(self, key):
+        """cached array for key, or None"""
+        if key in self._store:
+            self._store.move_to_end(key)
+            self._counts["hits"] += 1
+            return self._store[key]
+        if self.spill_dir is not None and os.path.exists(self._path(key)):
+            values = np.load(self._path(key))
+            self._counts["hits"] += 1
+            self._counts["disk_hits"] += 1
+            self.put(key, values)
+            return values
+        self._counts["misses"] += 1
+        return None
+
+    def put(self, key, values):
+        """cache an array, evicting the least recently used to stay in
+        budget"""
+        if not self.enabled or values.nbytes > self.max_bytes:
+            return
+        if key in self._store:
+            self._store.move_to_end(key)
+            return
+        self._store[key] = values
+        self.nbytes += values.nbytes
+        self.evict()
+
+    def evict(self):
+        """drop least recently used arrays until the cache is in budget"""
+        while self.nbytes > self.max_bytes:
+            old_key, old = self._store.popitem(last=False)
+            self.nbytes -= old.nbytes
+            self._counts["evictions"] += 1
+            if self.spill_dir is not None:
+                if not os.path.exists(self.spill_dir):
+                    os.makedirs(self.spill_dir)
+                if not os.path.exists(self._path(old_key)):
+                    np.save(self._path(old_key), old)
+                    self._counts["spills"] += 1
+
+    def clear(self):
+        """empty the in memory cache and reset the counters"""
+        self._store.clear()
+        self.nbytes = 0
+        self._counts = dict.fromkeys(self._counts, 0)
+
+    def stats(self):
+        """counters of cache usage"""
+        stats = dict(self._counts)
+        stats.update({"entries": len(self._store), "bytes": self.nbytes,
+                      "max_bytes": self.max_bytes})
+        return stats
+
+
+cache = TransformCache()
+
+
+def configure(max_bytes=None, spill=None, path="data/transform_cache"):
+    """
+    Set the budget of the transform cache
+
+    Parameters
+    ----------
+    max_bytes : int, default None
+            memory budget in bytes, 0 disables the cache. None keeps the
+            current budget
+    spill : Boolean, default None
+            write evicted variables to disk. None keeps the current setting
+    path : string, default data/transform_cache
+            folder for spilled variables, by default in the project's data
+            folder
+    """
+    if max_bytes is not None:
+        cache.max_bytes = max_bytes
+        cache.evict()
+    if spill is not None:
+        cache.spill_dir = path if spill else None
+
+
+def stats():
+    """hit, miss and eviction counts of the transform cache"""
+    return cache.stats()
+
+
+def clear():
+    """empty the transform cache"""
+    cache.clear()
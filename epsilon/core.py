@@ -4,6 +4,13 @@ class EO:
     Parameters
     ----------
     dataframe : Pandas DataFrame
+    lazy : Boolean, default False
+            only compute transformed variables when the model, a plot or an
+            export needs them
+    snapshot : string, default None
+            file of this instance to snapshot the cleaned data to for
+            reset, e.g. 'data/rawdata.arrow' in a project made by
+            create_project. None writes no snapshot
 
     Examples
     --------
@@ -27,24 +34,116 @@ class EO:
     epsilon.load
     """
 
-    def __init__(self, data):
+    def __init__(self, data, lazy=False, snapshot=None):
         from epsilon.model import Model
-        self.model = Model(data)
+        self.model = Model(data, lazy=lazy)
         self.data = self.model.data
+        # the cleaned source columns, and the version of the data they had
+        self._source = (self.data.columns.tolist(), self.data._version)
+        self._snapshot = None
+        if snapshot is not None:
+            self.snapshot(snapshot)
 
-    def reset(self):
+    def snapshot(self, path):
+        """
+        Write the cleaned source columns to an uncompressed Arrow file that
+        reset can memory map. Use a separate file for every EO, reset reads
+        the file of its own instance. Transformed variables are not written.
+
+        Parameters
+        ----------
+        path : string
+        """
+        import pyarrow as pa
+        import pyarrow.feather as feather
+        from pandas import DataFrame
+        columns, version = self._source
+        changed = self.data._changed(version, columns)
+        if changed:
+            raise ValueError(
+                "{} have changed since the data was loaded, snapshot before "
+                "overwriting them".format(changed))
+        table = pa.Table.from_pandas(DataFrame(self.data)[columns])
+        feather.write_feather(table, path, compression="uncompressed")
+        self._snapshot = path
+
+    def reset(self, columns=None):
         """
         Function to reset data back to original dataset.
 
         useful when you overwrite variable, doesn't require network access
 
+        The snapshot of this instance is memory mapped rather than read, so
+        only the pages of the columns that are used are loaded and the data
+        is not copied. Without a snapshot the project's data/rawdata.parquet
+        is read.
+
+        Parameters
+        ----------
+        columns : list, default None
+                only reset to these columns of the original dataset
         """
+        import pyarrow as pa
         from epsilon.model import Model
-        import pyarrow.parquet as pq
-        table = pq.read_table("data/rawdata.parquet")
-        rawdata = table.to_pandas()
-        self.model = Model(rawdata)
-        self.data = rawdata
+        path = self._snapshot
+        if path is not None:
+            source = pa.memory_map(path, "r")
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            rawdata = table.to_pandas(split_blocks=True, self_destruct=True)
+            self.model = Model(rawdata, lazy=self.data.lazy, validate=False)
+        else:
+            import pyarrow.parquet as pq
+            table = pq.read_table("data/rawdata.parquet", columns=columns)
+            rawdata = table.to_pandas()
+            self.model = Model(rawdata, lazy=self.data.lazy)
+        self.data = self.model.data
+        self._source = (self.data.columns.tolist(), self.data._version)
+
+    def instrument(self, enable=True, memory=False):
+        """
+        Turn timing of data, model and plotting operations on or off. There
+        is no overhead while it is off.
+
+        Parameters
+        ----------
+        enable : Boolean, default True
+        memory : Boolean, default False
+                also record bytes allocated, which slows operations down
+        """
+        from epsilon import _instrument
+        if enable:
+            _instrument.enable(memory=memory)
+        else:
+            _instrument.disable()
+
+    def stats(self, reset=False):
+        """
+        Time spent in each instrumented operation, with call counts, rows
+        and columns processed and bytes allocated
+
+        Parameters
+        ----------
+        reset : Boolean, default False
+                clear the recorded calls afterwards
+        """
+        from epsilon import _instrument
+        stats = _instrument.stats()
+        if reset:
+            _instrument.reset()
+        return stats
+
+    def trace(self, path):
+        """
+        Export the instrumented calls as Chrome trace JSON
+
+        Parameters
+        ----------
+        path : string
+        """
+        from epsilon import _instrument
+        _instrument.trace(path)
 
 
 def help():
@@ -10,6 +10,12 @@ class Data(pd.DataFrame):
     Parameters
     ----------
     dataframe : Pandas DataFrame
+    lazy : Boolean, default False
+            only record transformations when they are requested and compute
+            them when the variables are first used
+    validate : Boolean, default True
+            clean the column names and types, set False for data that has
+            already been through a Data object
 
     Examples
     --------
@@ -34,16 +40,32 @@ class Data(pd.DataFrame):
 
     """
 
+    _metadata = ["_graph", "lazy"]
+    # column statistics, not carried over to frames derived from the data
+    _stats = None
+    # counts changes to the values, so that values kept elsewhere can tell
+    # when they are stale
+    _version = 0
+    # the version at which each column was last assigned to, and at which
+    # all of them were last replaced, to tell which columns changed
+    _written = {}
+    _written_all = 0
+
     def __init__(self, data=None, index=None, columns=None, dtype=None,
-                 copy=False):
+                 copy=False, lazy=False, validate=True):
         super(Data, self).__init__(data, index, columns, dtype, copy)
-        from epsilon._utils import has_variation, convert_categoricals
+        from epsilon._graph import TransformGraph
+        self._graph = TransformGraph()
+        self.lazy = lazy
+        if not validate:
+            return
+        from epsilon._utils import column_stats, convert_categoricals
         from warnings import warn
         from textwrap import dedent
         convert_categoricals(data)
-        model_data = has_variation(data)
-        num_omitted_vars = len(data.columns) - len(model_data.columns)
-        omitted_vars = set(data.columns).difference(set(model_data.columns))
+        stats = column_stats(data, nunique=False)
+        omitted_vars = set(stats.index[~stats["varying"]])
+        num_omitted_vars = len(omitted_vars)
         if num_omitted_vars > 0:
             warn(
                 dedent("""
@@ -56,6 +78,9 @@ class Data(pd.DataFrame):
         columns = columns.str.replace(" ", "_")
         self.columns = columns
         self.index = self.index.to_datetime()
+        if len(stats) == len(columns):
+            stats.index = columns
+            self._stats = stats
 
     def handle_duplicate(self):
         """to deal with import of duplicate data"""
@@ -72,34 +97,177 @@ class Data(pd.DataFrame):
                 dup.append(col)
         return dup
 
-    def pow(self, var, power, inplace=True):
+    def __getitem__(self, key):
+        pending = getattr(self, "_graph", None)
+        if pending is not None and pending.pending:
+            names = [key] if isinstance(key, str) else key
+            if isinstance(names, list):
+                self.materialize([x for x in names if x in pending.pending])
+        return super(Data, self).__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super(Data, self).__setitem__(key, value)
+        self._version += 1
+        keys = key if isinstance(key, list) else [key]
+        written = dict(self._written)
+        written.update(dict.fromkeys(keys, self._version))
+        self._written = written
+        if self._stats is not None:
+            stale = [x for x in keys if x in self._stats.index]
+            if stale:
+                self._stats = self._stats.drop(stale)
+
+    def _update_inplace(self, *args, **kwargs):
+        super(Data, self)._update_inplace(*args, **kwargs)
+        self._version += 1
+        self._written_all = self._version
+        self._stats = None
+
+    def _changed(self, version, names):
+        """internal function giving the names that were assigned to after
+        version"""
+        if self._written_all > version:
+            return list(names)
+        return [x for x in names if self._written.get(x, 0) > version]
+
+    def profile(self, nunique=True):
         """
-        Create new variable that is a specified
-        variable raised to a given power
+        Statistics of every column: dtype, whether it is numeric, std, min,
+        max, number of nulls, number of unique values and whether it varies
+        across the dataset.
 
-        Also works on multiple variables.
+        The table is computed once and then only for columns that are
+        added, e.g. by transformations, or assigned to.
+
+        Parameters
+        ----------
+        nunique : Boolean, default True
+                count the unique values of the columns that have not been
+                counted yet. If False the counts may be missing
         """
-        subset = self[var].fillna(0)
-        powered = subset.pow(power)
-        powered = self._df_rename(powered, "**", power)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        from epsilon._utils import column_stats
+        stats = self._stats
+        if stats is None:
+            stats = column_stats(self, nunique=False)
+        elif len(stats) != len(self.columns) or \
+                (stats.index != self.columns).any():
+            new = [x for x in self.columns if x not in stats.index]
+            if new:
+                added = column_stats(
+                    super(Data, self).__getitem__(new), nunique=False)
+                stats = pd.concat([stats, added])
+            stats = stats.reindex(self.columns)
+        if nunique:
+            missing = stats.index[stats["nunique"].isnull()]
+            if len(missing):
+                stats = stats.copy()
+                for col in missing:
+                    stats.loc[col, "nunique"] = super(
+                        Data, self).__getitem__(col).nunique()
+                stats["nunique"] = stats["nunique"].astype(int)
+        self._stats = stats
+        return stats
+
+    def all_columns(self):
+        """
+        names of all variables in the data, including transformed variables
+        that have not been computed yet
+        """
+        pending = [x for x in self._graph.recipes if x in self._graph.pending]
+        return self.columns.tolist() + pending
 
-    def _df_rename(self, df, suffix, param):
+    def materialize(self, names=None):
         """
-        internal function to rename variables that have been transformed
+        Compute transformed variables that have been recorded but not yet
+        computed, along with any pending variables they are made from.
+        All variables are added to the data in one step.
+
+        Parameters
+        ----------
+        names : list, default None
+                variables to compute, defaults to all pending variables
         """
-        if isinstance(df, pd.core.series.Series):
-            df.name = str(df.name)+suffix+str(param)
-            if df.name in self.columns:
-                df = None
-        else:
-            df.columns = df.columns.map(lambda x: str(x)+suffix+str(param))
-            unique_df = df[df.columns.difference(self.columns)]
-            # TODO print warning if variables already exist df.columns is different from new_df.columns
-        return unique_df
+        if isinstance(names, str):
+            names = [names]
+        recipes = self._graph.resolve(names)
+        if recipes == []:
+            return
+        total = self._evaluate(recipes)
+        stats, written_all = self._stats, self._written_all
+        self._update_inplace(pd.concat([self, total], axis=1))
+        self._written_all = written_all
+        self._graph.done([x.name for x in recipes])
+        # the existing columns are unchanged, so their statistics are kept
+        if stats is not None:
+            from epsilon._utils import column_stats
+            self._stats = pd.concat([stats,
+                                     column_stats(total, nunique=False)])
+
+    def _fetch(self, name, fill=True):
+        """internal function to get the values of a variable for the graph"""
+        column = super(Data, self).__getitem__(name)
+        if fill:
+            column = column.fillna(0)
+        return column.values
+
+    def _evaluate(self, recipes):
+        """internal function to compute recipes as a DataFrame"""
+        from epsilon._graph import evaluate
+        from epsilon.cache import cache
+        values = evaluate(recipes, self._fetch,
+                          cache if cache.enabled else None)
+        return pd.DataFrame(values, index=self.index, columns=list(values))
+
+    def _transform(self, var, op, params, suffix, labels=None, inplace=True,
+                   **static):
+        """
+        internal function that records a transformation of each variable for
+        each parameter and computes it unless the data is lazy. Variables
+        that already exist are not recomputed
+        """
+        from epsilon._graph import Recipe
+        if not isinstance(var, list):
+            var = [var]
+        if not isinstance(params, list):
+            params = [params]
+        if labels is None:
+            labels = params
+        for col in var:
+            if col not in self.columns and col not in self._graph:
+                raise KeyError(col)
+        static = tuple(sorted(static.items()))
+        recipes = []
+        for param, label in zip(params, labels):
+            for col in var:
+                name = str(col)+suffix+str(label)
+                if name in self.columns or name in self._graph:
+                    continue
+                recipes.append(Recipe(name, op, (col,), param, static))
+        return self._record(recipes, inplace)
+
+    def _record(self, recipes, inplace):
+        """
+        internal function to add recipes to the graph, or to return the
+        data with the recipes computed when not inplace
+        """
+        if not inplace:
+            sources = [x for recipe in recipes for x in recipe.sources]
+            self.materialize(sources)
+            return pd.concat([self, self._evaluate(recipes)], axis=1)
+        for recipe in recipes:
+            self._graph.add(recipe)
+        if not self.lazy:
+            self.materialize([x.name for x in recipes])
+
+    def pow(self, var, power, inplace=True):
+        """
+        Create new variable that is a specified
+        variable raised to a given power
+
+        Also works on multiple variables and multiple powers.
+        """
+        return self._transform(var, "saturate", power, "**", inplace=inplace,
+                               curve="pow", scale=False)
 
     def lag(self, var, lag, val, inplace=True):
         """
@@ -107,20 +275,10 @@ class Data(pd.DataFrame):
 
         Also works on multiple variables.
         """
-        subset = self[var].fillna(0)
         if lag == 0:
             raise ValueError("A lag of zero is pointless!")
-        lagged = subset.shift(lag)
-        if lag > 0:
-            lagged.iloc[:lag] = val
-        else:
-            lagged.iloc[lag:] = val
-        lagged = self._df_rename(lagged, "_lag", lag)
-        result = pd.concat([self, lagged], axis=1)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        return self._transform(var, "shift", lag, "_lag", inplace=inplace,
+                               fill=val)
 
     def atan(self, var, alphas, inplace=True):
         """
@@ -130,21 +288,8 @@ class Data(pd.DataFrame):
 
         Also works on multiple variables.
         """
-        subset = self[var].fillna(0)
-        std = subset.div(subset.max())
-        if not isinstance(alphas, list):
-            alphas = [alphas]
-        total = []
-        for alpha in alphas:
-            atan = (np.arctan(std/alpha))/(np.pi/2)
-            atan = self._df_rename(atan, "_atan", alpha)
-            total.append(atan)
-        total = pd.concat(total, axis=1)
-        result = pd.concat([self, total], axis=1)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        return self._transform(var, "saturate", alphas, "_atan",
+                               inplace=inplace, curve="atan")
 
     def atansq(self, var, alphas, inplace=True):
         """
@@ -154,23 +299,28 @@ class Data(pd.DataFrame):
 
         Also works on multiple variables.
         """
-        subset = self[var].fillna(0)
-        std = subset.div(subset.max())
+        return self._transform(var, "saturate", alphas, "_atansq",
+                               inplace=inplace, curve="atansq")
+
+    def hill(self, var, alphas, shape=1.0, inplace=True):
+        """
+        Create a new variable that is a hill transformation of a specified
+        variable, x^shape / (x^shape + alpha^shape) on the variable scaled to
+        its maximum. alpha is the point of half saturation, a shape of one
+        gives diminishing returns and larger shapes an s-shaped (logistic in
+        log x) curve
+
+        Also works on multiple variables.
+        """
         if not isinstance(alphas, list):
             alphas = [alphas]
-        total = []
-        for alpha in alphas:
-            atansq = (np.arctan(std/alpha)**2)/(np.pi/2)
-            atansq = self._df_rename(atansq, "_atansq", alpha)
-            total.append(atansq)
-        total = pd.concat(total, axis=1)
-        result = pd.concat([self, total], axis=1)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        labels = alphas
+        if shape != 1.0:
+            labels = [str(alpha)+"_shape"+str(shape) for alpha in alphas]
+        return self._transform(var, "saturate", alphas, "_hill", labels,
+                               inplace=inplace, curve="hill", shape=shape)
 
-    def adstock(self, var, adstocks, inplace=True):
+    def adstock(self, var, adstocks, inplace=True, dtype=np.float64):
         """
         Create adstock(s) of a variable(s)
         Used to model advertising carryover into the next period.
@@ -185,41 +335,18 @@ class Data(pd.DataFrame):
         Attributes
         ----------
         var: list or string
-        decays: list or float
+        adstocks: list or float
         inplace: boolean
+        dtype: numpy dtype, e.g. np.float32 to halve the memory of the output
         """
-        if isinstance(adstocks, float):
+        if not isinstance(adstocks, list):
             adstocks = [adstocks]
         decays = [1-adstock for adstock in adstocks]
-        subset = self[var]
-        subset = subset.fillna(0)
-
-        def _decay(df, dec):
-            alpha = 1 - dec
-            N = len(df)
-            output = np.array(np.empty(N, dtype=float))
-            decayed = df[0]
-            output[0] = decayed
-            for i in range(1, N):
-                cur = df[i]
-                decayed = ((alpha * decayed) + cur)
-                output[i] = decayed
-            return output
-        if isinstance(decays, float):
-            decays = [decays]
-        total = []
-        for dec in decays:
-            applied = subset.apply(lambda x: _decay(x, dec))
-            applied = self._df_rename(applied, "_adstock", dec)
-            total.append(applied)
-        total = pd.concat(total, axis=1)
-        result = pd.concat([self, total], axis=1)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        return self._transform(var, "filter", [1-dec for dec in decays],
+                               "_adstock", decays, inplace=inplace,
+                               dtype=dtype)
 
-    def decay(self, var, decays, inplace=True):
+    def decay(self, var, decays, inplace=True, dtype=np.float64):
         """
         Create a new variable that decays away over time
         Used to model advertising carryover into the next period.
@@ -236,63 +363,36 @@ class Data(pd.DataFrame):
         var: list or string
         decays: list or float
         inplace: boolean
+        dtype: numpy dtype, e.g. np.float32 to halve the memory of the output
         """
-
-        subset = self[var]
-        subset = subset.fillna(0)
-
-        def _decay(df, dec):
-            alpha = 1 - dec
-            N = len(df)
-            output = np.array(np.empty(N, dtype=float))
-            decayed = df[0]
-            output[0] = decayed
-            for i in range(1, N):
-                cur = df[i]
-                decayed = ((alpha * decayed) + cur)
-                output[i] = decayed
-            return output
-        if isinstance(decays, float):
+        if not isinstance(decays, list):
             decays = [decays]
-        total = []
-        for dec in decays:
-            applied = subset.apply(lambda x: _decay(x, dec))
-            applied = self._df_rename(applied, "_dec", dec)
-            total.append(applied)
-        total = pd.concat(total, axis=1)
-        result = pd.concat([self, total], axis=1)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        return self._transform(var, "filter", [1-dec for dec in decays],
+                               "_dec", decays, inplace=inplace, dtype=dtype)
 
     def mult(self, var, newname=None, inplace=True):
         """
         Create a new variable that is a multiplicative combination of two
         variables. Used to model interaction between two variables.
         e.g. Promotion and Media
-
-        Also works on multiple variables.
-        decays a variable
         """
+        from epsilon._graph import Recipe
         if not len(var) == 2:
             raise ValueError("must pass of list of exactly two \
                 variable names to multiply")
-        multiplied = self[var[0]].mul(self[var[1]])
         if newname is None:
             name = var[0]+'*'+var[1]
         else:
             name = newname
-        multiplied.name = name
-        result = pd.concat([self, multiplied], axis=1)
-        if inplace:
-            self._update_inplace(result)
-        else:
-            return result
+        recipes = []
+        if name not in self.columns and name not in self._graph:
+            recipes.append(Recipe(name, "mult", tuple(var), None, ()))
+        return self._record(recipes, inplace)
 
     def to_frame(self):
         """convert epsilon Data object to pandas DataFrame"""
         from pandas import DataFrame
+        self.materialize()
         return DataFrame(self)
 
     def line(self, var):
@@ -0,0 +1,140 @@
+"""
+synthetic marketing mix datasets with known ground truth.
+
+Sales in each region are driven by adstocked, atan saturated media spend on
+top of a base level, yearly seasonality, promotions and noise. The true
+coefficients and transformation parameters are returned with the data so
+that benchmarks and recovery tests can check estimates against them.
+
+Examples
+--------
+>>> from epsilon.datasets import mmm
+>>> df, truth = mmm(weeks=156, regions=2, channels=4, seed=1)
+>>> truth["coefficients"]
+"""
+import numpy as np
+
+
+def mmm(weeks=156, regions=1, channels=6, extra=0, noise=0.05, seed=0,
+        start="2015-01-03"):
+    """
+    Generate weekly sales and media spend for one or more regions
+
+    For each region and channel, spend is adstocked with the channel's rate
+    and atan transformed with the channel's alpha as Data.adstock and
+    Data.atan would, then multiplied by the region's coefficient for the
+    channel.
+
+    Parameters
+    ----------
+    weeks : int, default 156
+    regions : int, default 1
+    channels : int, default 6
+            media channels per region
+    extra : int, default 0
+            additional variables per region that do not drive sales
+    noise : float, default 0.05
+            standard deviation of the noise as a proportion of the base
+    seed : int, default 0
+    start : string, default '2015-01-03'
+            first week ending date, weeks end on a saturday
+
+    Returns
+    -------
+    df : DataFrame
+            columns ``region{r}_sales``, ``region{r}_season``,
+            ``region{r}_promo``, ``region{r}_media_{c}`` and
+            ``region{r}_extra_{e}``
+    truth : dict
+            ``regions`` the column prefix of each region, ``sales`` the
+            sales columns, ``media`` the media columns, ``adstock`` and
+            ``alpha`` the transformation of each media column,
+            ``coefficients`` the coefficient of each transformed media column,
+            ``intercept`` the base level of each region, which is multiplied
+            by the season column, and ``promo`` the promotion effect of each
+            region
+    """
+    import pandas as pd
+    from epsilon._transforms import recursive_filter, saturate
+
+    rng = np.random.RandomState(seed)
+    index = pd.date_range(start, periods=weeks, freq="7D")
+    prefixes = ["region" + str(r) for r in range(regions)]
+
+    # channel level parameters, shared across regions
+    adstock = np.round(rng.uniform(0.1, 0.8, channels), 2)
+    alpha = np.round(rng.uniform(0.3, 1.5, channels), 2)
+
+    # media flighting: spend in bursts of on weeks
+    on = rng.rand(weeks, regions, channels) < 0.6
+    spend = rng.gamma(2., 500., size=(weeks, regions, channels)) * on
+    media = np.empty_like(spend)
+    for c in range(channels):
+        stocked = recursive_filter(spend[:, :, c], adstock[c])[:, 0, :]
+        media[:, :, c] = saturate(stocked.T, alpha[c], "atan")[:, 0, :]
+
+    intercept = rng.uniform(5000., 20000., regions)
+    coefficients = rng.uniform(0.02, 0.2, (regions, channels)) * \
+        intercept[:, None]
+    promo_effect = rng.uniform(0.05, 0.15, regions) * intercept
+    promo = (rng.rand(weeks, regions) < 0.1).astype(float)
+    season = 1 + 0.1 * np.sin(2 * np.pi * np.arange(weeks) / 52.18)
+
+    sales = (intercept * season[:, None] + promo * promo_effect +
+             np.einsum("wrc,rc->wr", media, coefficients) +
+             rng.normal(0, 1, (weeks, regions)) * noise * intercept)
+
+    seasonality = np.repeat(season[:, None, None], regions, axis=1)
+    blocks = [sales[:, :, None], seasonality, promo[:, :, None], spend]
+    names = ["sales", "season", "promo"] + ["media_" + str(c)
+                                            for c in range(channels)]
+    if extra > 0:
+        blocks.append(rng.gamma(2., 100., size=(weeks, regions, extra)))
+        names += ["extra_" + str(e) for e in range(extra)]
+    values = np.concatenate(blocks, axis=2).reshape(weeks, -1)
+    columns = [p + "_" + n for p in prefixes for n in names]
+    df = pd.DataFrame(values, index=index, columns=columns)
+
+    media_columns = [p + "_media_" + str(c)
+                     for p in prefixes for c in range(channels)]
+    truth = {"regions": prefixes,
+             "sales": [p + "_sales" for p in prefixes],
+             "media": media_columns,
+             "adstock": pd.Series(np.tile(adstock, regions),
+                                  index=media_columns),
+             "alpha": pd.Series(np.tile(alpha, regions),
+                                index=media_columns),
+             "coefficients": pd.Series(coefficients.ravel(),
+                                       index=media_columns),
+             "intercept": pd.Series(intercept, index=prefixes),
+             "promo": pd.Series(promo_effect, index=prefixes)}
+    return df, truth
+
+
+def to_workbooks(df, truth, folderpath):
+    """
+    Write a dataset as one workbook per region in its own sub folder, the
+    layout read_folder expects
+
+    Parameters
+    ----------
+    df : DataFrame
+    truth : dict
+            as returned by mmm
+    folderpath : string
+    """
+    import os
+    for region in truth["regions"]:
+        folder = os.path.join(folderpath, region)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        columns = [x for x in df.columns if x.startswith(region + "_")]
+        df[columns].to_excel(os.path.join(folder, region + ".xlsx"),
+                             sheet_name="output")
+
+
+def to_parquet(df, path):
+    """Write a dataset to a parquet file"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pq.write_table(pa.Table.from_pandas(df), path)
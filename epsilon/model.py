@@ -3,24 +3,35 @@ class Model:
     endogenous and exogenous variables that are entered. fits the model and
     captures the stats
 
+    Parameters
+    ----------
+    data : Pandas DataFrame
+    lazy : Boolean, default False
+            only compute transformed variables when the model, a plot or an
+            export needs them
+    validate : Boolean, default True
+            clean the column names and types of the data
+
     """
 
-    def __init__(self, data):
+    def __init__(self, data, lazy=False, validate=True):
+        from collections import OrderedDict
         from epsilon.data import Data
         from epsilon.plotting import ModelPlots
-        import pyarrow.parquet as pq
-
-        #need to write raw data to file
-        # table = pa.Table.from_pandas(data)
-        # pq.write_table(table, "./data/rawdata.parquet")
 
         self.rawdata = data
-        self.data = Data(data)
+        self.data = Data(data, lazy=lazy, validate=validate)
         self.variables_in = set()
         self.variables_out = None
         self.depvar = None
+        self.targets = []
+        self.fixed = OrderedDict()
         self._update_variables()
         self.fitdetail = None
+        self._ols_state = None
+        self._ols_fixed = None
+        self._ols_version = None
+        self._fixed_columns = None
         self.plotting = ModelPlots(self)
         self.sample = ([True]*len(self.data.index),
                        [True] * len(self.data.columns))
@@ -53,6 +64,10 @@ class Model:
             if var in self.variables_out:
                 self.variables_in.add(var)
                 self.variables_out.remove(var)
+            elif var in self.fixed:
+                # estimate a fixed coefficient again
+                del self.fixed[var]
+                self.variables_in.add(var)
             elif var not in self.variables_in:
                 raise ValueError(var+" not in dataset")
 
@@ -70,11 +85,11 @@ class Model:
         # ensure latest variables are in the variable list
         self._update_variables()
 
-        if self.variables_in == set():
+        if self.variables_in == set() and not self.fixed:
             return
 
         if variables == 'all':
-            variables = list(self.variables_in)
+            variables = list(self.variables_in) + list(self.fixed)
 
         if isinstance(variables, str):
             variables = [variables]
@@ -82,21 +97,47 @@ class Model:
             if var in self.variables_in:
                 self.variables_in.remove(var)
                 self.variables_out.add(var)
+            elif var in self.fixed:
+                del self.fixed[var]
+                self.variables_out.add(var)
 
     def dep(self, name):
         """
         set the dependent variable, can be a single name for a simple linear
-        regression. Panel regression not yet implemented.
+        regression or a list of names to fit every one of them against the
+        same regressors with ols. For panel regression across regions see
+        epsilon.panel.Panel.
 
         Parameters
         ----------
-        name : string
-                the column name of the dependent variable in the data
+        name : string or list
+                the column name of the dependent variable in the data, or
+                the names of several dependent variables. The first is used
+                by estimators other than ols
 
         """
-        from epsilon._utils import has_variation
         from pandas import notnull
 
+        if isinstance(name, list) and len(name) > 1:
+            return self._dep_many(name)
+        if isinstance(name, list):
+            name = name[0]
+        if len(self.targets) > 1:
+            self._update_variables()
+            if (name not in self.targets and name not in self.variables_in
+                    and name not in self.variables_out):
+                raise ValueError(
+                    "{} is not a column name in the data".format(name))
+            # return the other targets of a multi target model to the data
+            if name in self.targets:
+                self.targets = [name]
+                self.depvar = self.data[name]
+                self.sample = (notnull(self.depvar), self.sample[1])
+                self._ols_state = None
+                self._update_variables()
+                return
+            self.targets = [self.depvar.name]
+            self._update_variables()
         if self.depvar is None:
             if name in self.variables_out:
                 self.variables_out.remove(name)
@@ -104,8 +145,11 @@ class Model:
                 self.depvar = depvar
                 # create sample based on dep var
                 keep_rows = notnull(self.data[name])
-                keep_columns = has_variation(self.data).columns
+                profile = self.data.profile(nunique=False)
+                keep_columns = profile.index[profile["varying"]]
                 self.sample = (keep_rows, keep_columns)
+                self._ols_state = None
+                self.targets = [name]
             else:
                 raise ValueError(
                     "{} is not a column name in the data".format(name))
@@ -124,60 +168,209 @@ class Model:
             self.depvar = depvar
             # create sample based on dep var
             keep_rows = notnull(self.data[name])
-            keep_columns = has_variation(self.data).columns
+            profile = self.data.profile(nunique=False)
+            keep_columns = profile.index[profile["varying"]]
             self.sample = (keep_rows, keep_columns)
+            self._ols_state = None
+            self.targets = [name]
+
+    def _dep_many(self, names):
+        """internal function to set several dependent variables, the sample
+        is the observations where all of them are present"""
+        self._update_variables()
+        for name in names:
+            if (name not in self.variables_out and
+                    name not in self.variables_in and
+                    name not in self.targets):
+                raise ValueError(
+                    "{} is not a column name in the data".format(name))
+        removed = self.variables_in & set(names)
+        if removed:
+            self.variables_in -= removed
+            print('Dependent Variables {} removed from variables in'.format(
+                sorted(removed)))
+        self.targets = list(names)
+        self.depvar = self.data[names[0]]
+        self._update_variables()
+        keep_rows = self.data[names].notnull().all(axis=1)
+        profile = self.data.profile(nunique=False)
+        keep_columns = profile.index[profile["varying"]]
+        self.sample = (keep_rows, keep_columns)
+        self._ols_state = None
+
+    def _get_exog(self, variables=None):
+        """function to prepare dataset for modelling
 
-    def _get_exog(self):
-        """function to prepare dataset for modelling"""
-        df = self.data
-        df = df.loc[self.sample]
+        Parameters
+        ----------
+        variables : list, default None
+                variables to prepare, defaults to the variables in the model
+        """
+        if variables is None:
+            variables = list(self.variables_in)
+        self.data.materialize(list(variables) + [self.depvar.name])
+        df = self.data.loc[self.sample[0],
+                           list(variables) + [self.depvar.name]]
         df = df.dropna(how="all", subset=[self.depvar.name], axis=0)
         df = df.fillna(0)
-        df = df[list(self.variables_in)]
+        df = df[list(variables)]
         return df
 
-    def ols(self, constant=True):
+    def ols(self, constant=True, refit=False, summary=True):
         """
         fits the specified endogenous and exogenous variables with an OLS
         estimation
 
+        The factorisation of the design is kept between calls, so variables
+        added or removed since the last fit are applied as column updates
+        rather than refitting from scratch.
+
         Parameters
         ----------
         constant : Boolean, default True
                 estimate the model with a constant
+        refit : Boolean, default False
+                discard the kept factorisation and refit from scratch.
+                Variables overwritten since the last fit are entered again
+                without it
+        summary : Boolean, default True
+                return the summary of the fit, which is only built when it is
+                displayed. False skips it and returns the fit
+
+        With several dependent variables every one is fitted against a
+        single factorisation of the design and fitdetail is a
+        MultiOLSResult, indexed by target for the fit of each one.
         """
-        import statsmodels.api as sm
-
+        from pandas import DataFrame
+        from epsilon._ols import IncrementalOLS, OLSResult
+
+        if len(self.targets) > 1:
+            return self._ols_many(constant, summary)
+        state = self._ols_state
+        # variables overwritten since the last fit are entered again, and a
+        # new dependent variable needs a new factorisation
+        changed = []
+        if state is not None and self._ols_version != self.data._version:
+            changed = self.data._changed(
+                self._ols_version,
+                [x for x in state.names if x != "const"] +
+                [self.depvar.name])
+        if (refit or state is None or self.depvar.name in changed or
+                ("const" in state.names) != (constant is True)):
+            if refit:
+                self._fixed_columns = None
+            if self.depvar.name in changed:
+                self.depvar = self.data[self.depvar.name]
+            index = self._get_exog([]).index
+            state = IncrementalOLS(self._endog(index))
+            if constant is True:
+                state.add("const", [1.0] * len(index))
+            self._ols_state = state
+            self._ols_fixed = self._fixed_key()
+        elif self._ols_fixed != self._fixed_key():
+            # only the offset changed, the factor of the design still holds
+            state.set_y(self._endog(state.index))
+            self._ols_fixed = self._fixed_key()
+        self._ols_version = self.data._version
+        fixed = {"const"} if constant is True else set()
+        for var in [x for x in state.names
+                    if x not in self.variables_in | fixed or x in changed]:
+            state.drop(var)
+        new = [x for x in self.variables_in if x not in state.names]
+        if new:
+            x = self._get_exog(new)
+            for var in new:
+                state.add(var, x[var].values)
+
+        fit = state.fit()
+        x = DataFrame(state._X, index=state.index, columns=state.names)
+        self.fitdetail = OLSResult(x, self.depvar.loc[state.index],
+                                   **dict(fit, **self._fixed_terms(x.index)))
+        return self._summary(summary)
+
+    def _ols_many(self, constant=True, summary=True):
+        """internal function fitting every dependent variable against one
+        factorisation of the design"""
+        from epsilon._ols import multi_ols, MultiOLSResult
+
+        if self.fixed:
+            raise ValueError("fixed coefficients are not supported with "
+                             "several dependent variables")
         x = self._get_exog()
-        Y = self.depvar.loc[self.sample[0]]
         if constant is True:
-            x = sm.add_constant(x)
-        modelspec = sm.OLS(Y, x)
-        return self._fit(modelspec)
+            x.insert(0, "const", 1.0)
+        Y = self.data.loc[x.index, self.targets]
+        fit = multi_ols(x.values, Y.values)
+        self.fitdetail = MultiOLSResult(x, Y, **fit)
+        return self._summary(summary)
+
+    def rolling(self, window=None, min_obs=None, constant=True):
+        """
+        re-estimate the model over rolling or expanding windows to check the
+        stability of the coefficients. Windows are updated one observation
+        at a time with recursive least squares instead of refitting each.
+
+        Parameters
+        ----------
+        window : int, default None
+                observations in each rolling window, None for expanding
+                windows from the start of the sample
+        min_obs : int, default None
+                observations in the first expanding window, defaults to one
+                more than the number of coefficients. Cannot be combined
+                with window
+        constant : Boolean, default True
+                estimate the model with a constant
 
-    def gls(self, constant=True, sigma=None):
+        Returns
+        -------
+        dict
+                params, bse and tvalues DataFrames with a row per window,
+                indexed by the last observation of the window, and nobs and
+                rsquared Series
+        """
+        from pandas import DataFrame, Series
+        from epsilon._ols import recursive_ols
+
+        x = self._get_exog()
+        if constant is True:
+            x.insert(0, "const", 1.0)
+        Y = self._endog(x.index)
+        fit = recursive_ols(x.values, Y.values, window=window,
+                            min_obs=min_obs)
+        index = x.index[fit["ends"] - 1]
+        result = dict((stat, DataFrame(fit[stat], index=index,
+                                       columns=x.columns))
+                      for stat in ["params", "bse", "tvalues"])
+        for stat in ["nobs", "rsquared"]:
+            result[stat] = Series(fit[stat], index=index)
+        return result
+
+    def gls(self, constant=True, sigma=None, summary=True):
         """fits the specified endogenous and exogenous variables with an OLS
         estimation"""
         import statsmodels.api as sm
 
         x = self._get_exog()
-        Y = self.depvar.loc[self.sample]
+        Y = self._endog(x.index)
         if constant is True:
             x = sm.add_constant(x)
         modelspec = sm.OLS(Y, x)
-        return self._fit(modelspec)
+        return self._fit(modelspec, summary=summary,
+                         fixed=self._fixed_terms(x.index))
 
-    def rlm(self, constant=True, **kwargs):
+    def rlm(self, constant=True, summary=True, **kwargs):
         """fits the specified endogenous and exogenous variables with as a
         robust linear model estimation"""
         import statsmodels.api as sm
 
         x = self._get_exog()
-        Y = self.depvar.loc[self.sample]
+        Y = self._endog(x.index)
         if constant is True:
             x = sm.add_constant(x)
         modelspec = sm.RLM(Y, x, **kwargs)
-        return self._fit(modelspec)
+        return self._fit(modelspec, summary=summary,
+                         fixed=self._fixed_terms(x.index))
 
     def _var(self, lag='auto'):
         """needs to generalise fit function"""
@@ -192,67 +385,294 @@ class Model:
         data = self.data(variables)
         modelspec = sm.tsa.VAR(data)
 
-        return self._fit(modelspec, params)
+        return self._fit(modelspec, **params)
 
-    def _fit(self, modelspec, **kwargs):
+    def _fit(self, modelspec, summary=True, fixed=None, **kwargs):
         """generic statsmodels fit function that takes any statsmodels
         estimation method"""
-        import statsmodels.api as sm
-        fit = modelspec.fit()
-        self.fitdetail = fit
-        return fit.summary()
+        from epsilon._ols import FitResult
+        fit = modelspec.fit(**kwargs)
+        self.fitdetail = FitResult(fit, **(fixed or {}))
+        return self._summary(summary)
+
+    def _summary(self, summary=True):
+        """summary of the latest fit, built only when it is displayed"""
+        from epsilon._ols import LazySummary
+        if summary is not True:
+            return self.fitdetail
+        return LazySummary(self.fitdetail.summary)
 
     def _sample(self, period):
         """restrict the modelling period to a sample of the total dataset"""
         # set sample obs widget
         raise NotImplementedError()
 
-    def _fix(self, variables, values):
-        """fix a variable coefficient to a specified number based on other
-        information"""
-        raise NotImplementedError()
+    def fix(self, variables, values):
+        """
+        fix the coefficients of variables to values known from other
+        information, e.g. a test or another model. Fixed variables are not
+        estimated, their terms are subtracted from the dependent variable as
+        an offset and fits, previews, contributions and forecasts include
+        them. Changing only the values of fixed coefficients reuses the
+        kept factorisation of the ols design.
+
+        Parameters
+        ----------
+        variables : list or string
+        values : list or float
+                the coefficient of each variable
+        """
+        self._update_variables()
+        if isinstance(variables, str):
+            variables = [variables]
+        if not isinstance(values, (list, tuple)):
+            values = [values] * len(variables)
+        if len(values) != len(variables):
+            raise ValueError("pass a value for each variable")
+        for var in variables:
+            if (var not in self.variables_in and
+                    var not in self.variables_out and var not in self.fixed):
+                raise ValueError(var+" not in dataset")
+        for var, value in zip(variables, values):
+            self.variables_in.discard(var)
+            self.variables_out.discard(var)
+            self.fixed[var] = float(value)
+
+    def unfix(self, variables='all'):
+        """
+        estimate the coefficients of fixed variables again
 
-    def preview(self, subset="all"):
+        Parameters
+        ----------
+        variables : list or string, default 'all'
+        """
+        if variables == 'all':
+            variables = list(self.fixed)
+        if isinstance(variables, str):
+            variables = [variables]
+        for var in variables:
+            if var in self.fixed:
+                del self.fixed[var]
+                self.variables_in.add(var)
+
+    def _fixed_terms(self, index):
+        """internal function giving the fixed variables and coefficients of
+        the observations in index, the keyword arguments of a result"""
+        from pandas import Series
+        if not self.fixed:
+            return {}
+        names = list(self.fixed)
+        key = (self.depvar.name, names, self.data._version)
+        if (self._fixed_columns is None or self._fixed_columns[0] != key or
+                not self._fixed_columns[1].index.equals(index)):
+            # the values of the fixed variables are only read when the
+            # variables, the data or the sample change, not when their
+            # coefficients do
+            self._fixed_columns = (key, self._get_exog(names).loc[index])
+        return {"fixed": self._fixed_columns[1],
+                "fixed_params": Series(self.fixed)}
+
+    def _fixed_key(self):
+        """internal function identifying the offset of the fixed terms"""
+        if not self.fixed:
+            return None
+        return list(self.fixed.items()), self.data._version
+
+    def _endog(self, index):
+        """internal function giving the dependent variable less the fixed
+        terms, for the observations in index"""
+        from epsilon._ols import _offset
+        y = self.depvar.loc[index]
+        if not self.fixed:
+            return y
+        return y - _offset(**self._fixed_terms(index))
+
+    def preview(self, subset="all", constant=True):
         """
         view statistics for variables outside of the model if they were
         entered into the model. Currently only based on an ols regression
 
+        The current model is factored once and partialled out of every
+        candidate, so each candidate's statistics are computed in closed form
+        rather than with a full refit.
+
         Parameters
         ----------
         subset : list or string
                 variable or list of variables to test
-        method : string, default ols
-                estimation method to use
+        constant : Boolean, default True
+                estimate the model with a constant
         """
         from pandas import DataFrame
+        from epsilon._ols import partial_regressions
 
         if subset == "all":
             self._update_variables()
             subset = self.variables_out
         elif type(subset) == str:
             import re
-            match = [re.match(subset, x) for x in self.data.columns]
+            match = [re.match(subset, x) for x in self.data.all_columns()]
             match = [x.string for x in match if x is not None]
             subset = match
-        params = []
-        for var in subset:
-            self.add(var)
-            self.ols()
-            params.append({"Variable Name": var,
-                           "coefficient": self.fitdetail.params[var],
-                           "t-stat": self.fitdetail.tvalues[var],
-                           "PValue": self.fitdetail.pvalues[var],
-                           "Adjusted Rsquared": self.fitdetail.rsquared_adj})
-            self.rem(var)
-        self.ols()
-        params = DataFrame(params)
+        exclude = (self.variables_in | {self.depvar.name} | set(self.targets) |
+                   set(self.fixed))
+        # computed columns without variation or that are not numeric cannot
+        # be estimated, transformations that are still pending are numeric
+        profile = self.data.profile(nunique=False)
+        skip = set(profile.index[~(profile["varying"] & profile["numeric"])])
+        subset = [x for x in subset if x not in exclude and x not in skip]
+        candidates = self._get_exog(subset)
+
+        x = self._get_exog()
+        if constant is True:
+            x.insert(0, "const", 1.0)
+        Y = self._endog(x.index)
+        stats = partial_regressions(x.values, Y.values, candidates.values)
+        params = DataFrame({"Variable Name": candidates.columns,
+                            "coefficient": stats["params"],
+                            "t-stat": stats["tvalues"],
+                            "PValue": stats["pvalues"],
+                            "Adjusted Rsquared": stats["rsquared_adj"]},
+                           columns=["Variable Name", "coefficient", "t-stat",
+                                    "PValue", "Adjusted Rsquared"])
         params = params[params["coefficient"] != 0]
         params["abs(t-stat)"] = params["t-stat"].map(abs)
         params = params.set_index("Variable Name")
         return params.sort_values("abs(t-stat)", ascending=False)
 
-    def _forecast(self, sample):
-        raise NotImplementedError()
+    def forecast(self, scenarios, channels, start=None):
+        """
+        predict the dependent variable under scenarios for some of the raw
+        variables, e.g. media plans giving the spend of each channel in
+        each week. The transformations of every regressor made from the
+        channels are replayed on the scenario values and the fitted
+        coefficients applied, for all scenarios at once. Saturation curves
+        keep the scaling of the historical data.
+
+        Scenario weeks replace the values in the data, to plan future weeks
+        add them to the data with the values of the other variables first.
+
+        Parameters
+        ----------
+        scenarios : array-like, shape (n_scenarios, n_weeks, n_channels)
+        channels : list
+                the raw variables set by the scenarios, in the order of the
+                last axis
+        start : index label, default None
+                the first scenario week, defaults to the last n_weeks of the
+                data
+
+        Returns
+        -------
+        dict
+                index, the weeks from the first scenario week to the end of
+                the data, prediction of shape (n_scenarios, n_index), which
+                includes carryover after the scenario weeks, and baseline,
+                the prediction with the historical values
+        """
+        import numpy as np
+        from epsilon._simulate import simulate
+
+        if isinstance(channels, str):
+            channels = [channels]
+        scenarios = np.asarray(scenarios, dtype=float)
+        if scenarios.ndim == 2:
+            scenarios = scenarios[:, :, None]
+        params = self._coefficients()
+        self.data.materialize([x for x in params.index if x != "const"] +
+                              list(channels))
+        if start is None:
+            start = len(self.data.index) - scenarios.shape[1]
+        else:
+            start = self.data.index.get_loc(start)
+        fetch = self.data._fetch
+        graph = self.data._graph
+        prediction = simulate(graph, fetch, params, channels, scenarios,
+                              start)
+        history = np.column_stack([fetch(x, True) for x in channels])
+        history = history[start:start + scenarios.shape[1]][None]
+        baseline = simulate(graph, fetch, params, channels, history, start)
+        return {"index": self.data.index[start:],
+                "prediction": prediction.T,
+                "baseline": baseline[:, 0]}
+
+    def optimize(self, budget, channels, weeks=52, start=None, bounds=None,
+                 phasing=None):
+        """
+        allocate a total budget across channels to maximise the predicted
+        contribution of the plan weeks, using the exact gradient of the
+        response curves of the model. A list of budgets is solved in turn,
+        each starting from the previous allocation, e.g. to trace the
+        response curve of the total budget.
+
+        Parameters
+        ----------
+        budget : float or list
+                non-negative, a budget of zero allocates nothing
+        channels : list
+                the raw spend variables to allocate between
+        weeks : int, default 52
+                length of the plan
+        start : index label, default None
+                the first plan week, defaults to the last weeks of the data
+        bounds : dict, default None
+                channel: (min, max) limits on the total of a channel, either
+                may be None
+        phasing : array-like, shape (weeks, n_channels), default None
+                how the total of each channel is spread over the plan
+                weeks, defaults to the historical spend of those weeks or
+                evenly where a channel had none
+
+        Returns
+        -------
+        DataFrame
+                one row per budget with the total of each channel and the
+                predicted contribution, the prediction less that with no
+                spend in the plan weeks
+        """
+        import numpy as np
+        from pandas import DataFrame
+        from epsilon._simulate import allocate
+
+        if isinstance(channels, str):
+            channels = [channels]
+        budgets = budget if isinstance(budget, list) else [budget]
+        params = self._coefficients()
+        self.data.materialize([x for x in params.index if x != "const"] +
+                              list(channels))
+        weeks = min(weeks, len(self.data.index))
+        if start is None:
+            start = len(self.data.index) - weeks
+        else:
+            start = self.data.index.get_loc(start)
+        fetch = self.data._fetch
+        if phasing is None:
+            phasing = np.column_stack([fetch(x, True) for x in channels])
+            phasing = phasing[start:start + weeks]
+        phasing = np.asarray(phasing, dtype=float)
+        sums = phasing.sum(axis=0)
+        phasing = np.where(sums > 0, phasing / np.where(sums > 0, sums, 1),
+                           1. / len(phasing))
+        if bounds is not None:
+            bounds = [bounds.get(x, (None, None)) for x in channels]
+        totals, contributions, _ = allocate(self.data._graph, fetch, params,
+                                            channels, budgets, start,
+                                            phasing, bounds)
+        result = DataFrame(totals, index=budgets, columns=channels)
+        result["contribution"] = contributions
+        return result
+
+    def _coefficients(self):
+        """internal function giving the coefficients of the latest fit of
+        the dependent variable, fixed ones included"""
+        from pandas import concat
+        params = self.fitdetail.params
+        if params.ndim == 2:
+            params = params[self.depvar.name]
+        fixed = getattr(self.fitdetail, "fixed_params", None)
+        if fixed is not None:
+            params = concat([params, fixed])
+        return params
 
     def _group(self):
         """place variables_in into contribution groups"""
@@ -266,11 +686,14 @@ class Model:
         """internal function that updates the variables_out with new variables
         that have been added to the dataset"""
         from pandas import DataFrame
-        allvars = self.data.columns.tolist()
+        allvars = self.data.all_columns()
         if self.depvar is not None:
             self.variables_out = (set(allvars)
                                   - self.variables_in
-                                  - {self.depvar.name})
+                                  - {self.depvar.name}
+                                  - set(self.targets)
+                                  - set(self.fixed))
         else:
-            self.variables_out = set(allvars) - self.variables_in
+            self.variables_out = (set(allvars) - self.variables_in -
+                                  set(self.fixed))
         self.variables = DataFrame(allvars, columns=['Variable Name'])
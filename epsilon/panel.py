@@ -0,0 +1,239 @@
+"""
+panel regression of one specification across many regions or brands.
+
+The data holds one column per unit for every variable, named by a template
+such as ``{unit}_{var}``. A Panel applies the dependent variable,
+regressors and transformations to every unit at once: transformations run
+as one batched call over all units' columns and the variables are stacked
+into a (units, observations, regressors) array, so that separate fits of
+every unit are solved together and pooled and fixed effects fits are a
+single regression.
+
+Examples
+--------
+>>> from epsilon.datasets import mmm
+>>> from epsilon.panel import Panel
+>>> df, truth = mmm(weeks=156, regions=200, channels=4)
+>>> panel = Panel(df, truth["regions"])
+>>> panel.transform("adstock", ["media_0", "media_1"], 0.5)
+>>> panel.dep("sales")
+>>> panel.add(["season", "promo", "media_0_adstock0.5"])
+>>> panel.fit(effects="unit").params
+"""
+import numpy as np
+
+
+class PanelResult:
+    """
+    Estimates of a panel fit
+
+    Attributes
+    ----------
+    effects : string
+            'unit', 'pooled' or 'fixed'
+    params, bse, tvalues, pvalues : DataFrame or Series
+            one row per unit for unit fits, otherwise a Series
+    rsquared, nobs, df_resid : Series or float
+    unit_effects : Series
+            the intercept of each unit in a fixed effects fit
+    resid : DataFrame
+            residuals, one column per unit, nan outside the sample
+    """
+
+    def __init__(self, effects, names, units, index, fit, unit_effects=None):
+        from pandas import DataFrame, Series
+
+        self.effects = effects
+        resid = np.where(fit["mask"], fit["resid"], np.nan)
+        self.resid = DataFrame(resid.T, index=index, columns=units)
+        if effects == "unit":
+            for stat in ["params", "bse", "tvalues", "pvalues"]:
+                setattr(self, stat, DataFrame(fit[stat], index=units,
+                                              columns=names))
+            for stat in ["rsquared", "nobs", "df_resid"]:
+                setattr(self, stat, Series(fit[stat], index=units))
+        else:
+            for stat in ["params", "bse", "tvalues", "pvalues"]:
+                setattr(self, stat, Series(fit[stat][0], index=names))
+            for stat in ["rsquared", "nobs", "df_resid"]:
+                setattr(self, stat, fit[stat][0])
+        self.unit_effects = unit_effects
+
+
+class Panel:
+    """
+    One model specification applied to many cross-sections
+
+    Parameters
+    ----------
+    data : DataFrame or Data
+            one column per unit and variable
+    units : list
+            the names of the regions, brands or other cross-sections
+    template : string, default '{unit}_{var}'
+            how a unit's column of a variable is named. Transformed
+            variables are named by appending the transformation to the
+            column name, so they follow prefix templates like the default
+    lazy : Boolean, default False
+            see Data
+    """
+
+    def __init__(self, data, units, template="{unit}_{var}", lazy=False):
+        from epsilon.data import Data
+        if not isinstance(data, Data):
+            data = Data(data, lazy=lazy)
+        self.data = data
+        self.units = list(units)
+        self.template = template
+        self.depvar = None
+        self.variables_in = []
+
+    def columns(self, var):
+        """the column of var for every unit, cleaned as Data cleans names"""
+        return [self.template.format(unit=unit, var=var).lower().strip(" ")
+                .replace(" ", "_") for unit in self.units]
+
+    def _check(self, var):
+        """internal function checking every unit has a column for var"""
+        available = set(self.data.all_columns())
+        missing = [x for x in self.columns(var) if x not in available]
+        if missing:
+            raise ValueError("{} is missing for {} units: {}".format(
+                var, len(missing), missing[:5]))
+
+    def dep(self, name):
+        """
+        set the dependent variable of every unit
+
+        Parameters
+        ----------
+        name : string
+                the variable, without the unit
+        """
+        self._check(name)
+        if name in self.variables_in:
+            self.variables_in.remove(name)
+        self.depvar = name
+
+    def add(self, names):
+        """
+        add regressors to the model of every unit
+
+        Parameters
+        ----------
+        names : list or string
+                variables, without the unit
+        """
+        if not isinstance(names, list):
+            names = [names]
+        for name in names:
+            self._check(name)
+        self.variables_in += [x for x in names if x not in self.variables_in]
+
+    def remove(self, names):
+        """
+        remove regressors from the model of every unit
+
+        Parameters
+        ----------
+        names : list or string
+        """
+        if not isinstance(names, list):
+            names = [names]
+        self.variables_in = [x for x in self.variables_in if x not in names]
+
+    def transform(self, method, var, *args, **kwargs):
+        """
+        apply a Data transformation to the columns of every unit in one
+        batched call
+
+        Parameters
+        ----------
+        method : string
+                name of the Data method, e.g. 'adstock' or 'atan'
+        var : list or string
+                variables, without the unit
+        *args, **kwargs
+                passed to the Data method
+        """
+        if not isinstance(var, list):
+            var = [var]
+        columns = [x for name in var for x in self.columns(name)]
+        return getattr(self.data, method)(columns, *args, **kwargs)
+
+    def array(self, variables):
+        """
+        the variables of every unit stacked into one array
+
+        Parameters
+        ----------
+        variables : list
+
+        Returns
+        -------
+        ndarray, shape (n_units, n_obs, n_variables)
+        """
+        columns = [self.columns(var) for var in variables]
+        self.data.materialize([x for names in columns for x in names])
+        values = np.empty((len(self.units), len(self.data.index),
+                           len(variables)))
+        for i, names in enumerate(columns):
+            values[:, :, i] = self.data[names].values.T
+        return values
+
+    def fit(self, effects="unit", constant=True):
+        """
+        fit the model of every unit
+
+        Parameters
+        ----------
+        effects : string, default 'unit'
+                'unit' fits every unit separately, all solved in one
+                batch. 'pooled' fits one set of coefficients to all units
+                stacked together. 'fixed' fits one set of coefficients with
+                a separate intercept for every unit, using the within
+                transformation
+        constant : Boolean, default True
+                include a constant in 'unit' and 'pooled' fits
+
+        Returns
+        -------
+        PanelResult
+        """
+        from pandas import Series
+        from epsilon._ols import batched_ols, within
+
+        if self.depvar is None:
+            raise ValueError("set the dependent variable with dep first")
+        if effects not in ("unit", "pooled", "fixed"):
+            raise ValueError("effects must be 'unit', 'pooled' or 'fixed'")
+        names = list(self.variables_in)
+        X = self.array(names)
+        y = self.array([self.depvar])[:, :, 0]
+        mask = ~np.isnan(y) & ~np.isnan(X).any(axis=2)
+        unit_effects = None
+
+        if effects == "fixed":
+            Xw, yw, X_mean, y_mean = within(X, y, mask)
+            absorbed = int((mask.sum(axis=1) > 0).sum())
+            fit = batched_ols(Xw[mask][None], yw[mask][None],
+                              absorbed=absorbed)
+            intercepts = y_mean - X_mean.dot(fit["params"][0])
+            unit_effects = Series(intercepts, index=self.units)
+            fitted = np.einsum('unk,k->un', X, fit["params"][0])
+            resid = y - fitted - intercepts[:, None]
+        else:
+            if constant:
+                X = np.concatenate([np.ones(X.shape[:2] + (1,)), X], axis=2)
+                names = ["const"] + names
+            if effects == "unit":
+                fit = batched_ols(X, y, mask, centered=constant)
+                resid = fit["resid"]
+            else:
+                fit = batched_ols(X[mask][None], y[mask][None],
+                                  centered=constant)
+                resid = y - np.einsum('unk,k->un', X, fit["params"][0])
+        fit["resid"] = resid
+        fit["mask"] = mask
+        return PanelResult(effects, names, self.units, self.data.index, fit,
+                           unit_effects)
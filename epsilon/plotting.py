@@ -1,4 +1,3 @@
-import bokeh.plotting as bk
 _colors = ['#1f77b4',
            '#ff7f0e',
            '#2ca02c',
@@ -17,40 +16,102 @@ _colors = ['#1f77b4',
            '#98df8a',
            '#ff9896']
 
+_notebook = {"enabled": False}
+
+
+def output_notebook(**kwargs):
+    """
+    Display charts inline in a Jupyter notebook. Called on the first plot
+    if it has not been called already; bokeh is only imported then, so
+    importing epsilon does not depend on it.
+
+    Parameters
+    ----------
+    **kwargs
+            passed to bokeh.plotting.output_notebook
+    """
+    import bokeh.plotting as bk
+    bk.output_notebook(**kwargs)
+    _notebook["enabled"] = True
+
+
+def show(plot):
+    """show a chart, enabling notebook output on first use"""
+    import bokeh.plotting as bk
+    if not _notebook["enabled"]:
+        output_notebook()
+    bk.show(plot)
+
 
 class ModelPlots:
 
     def __init__(self, model):
         self._model = model
 
-    def avm(self):
-        """Produce a line chart of actual data vs fitted data."""
+    def _fit(self):
+        """the fit of the dependent variable, the fit of its target when
+        several were fitted together"""
+        fit = self._model.fitdetail
+        if hasattr(fit, "targets"):
+            return fit[self._model.depvar.name]
+        return fit
+
+    def _avm(self):
+        """chart function and arguments of the actual vs model chart"""
         from pandas import concat
         from pandas import Series
 
         obs = self._model.obs()
         actual = self._model.depvar[self._model.sample[0]]
-        predict = self._model.fitdetail.predict()
+        predict = self._fit().predict()
         model = Series(predict, index=obs, name='Model')
 
         combined = concat([actual, model], axis=1)
-        line(combined)
+        return "line", (combined,)
 
-    def con(self):
-        """Produce a contribution chart. A stacked chart of all the components
-        that make up the dependent variable"""
-        from pandas import DataFrame
-        obs = self._model.obs()
+    def _con(self):
+        """chart function and arguments of the contribution chart"""
         actual = self._model.depvar[self._model.sample[0] == 1]
-        exog = self._model.fitdetail.model.exog
-        coeffs = self._model.fitdetail.params.values
-        contribs = (exog*coeffs)
+        contribs = self._fit().contributions()
+        contribs.index = self._model.obs()
+        return "stackedBarAndLine", (actual, contribs)
 
-        contribs = DataFrame(contribs, index=obs,
-                             columns=self._model.fitdetail.params.keys())
-        stackedBarAndLine(actual, contribs)
+    def _res(self, percent=True):
+        """chart function and arguments of the residual chart"""
+        fit = self._fit()
+        resid = fit.resid
+        if percent is True:
+            resid = fit.resid.div(fit.model.endog)
+            resid.columns = ["Residuals"]
+        resid.name = "Residuals"
+        return "line", (resid,)
+
+    def avm(self, display=True):
+        """
+        Produce a line chart of actual data vs fitted data.
+
+        Parameters
+        ----------
+        display : Boolean, default True
+                show the chart, otherwise only return it
+        """
+        chart, args = self._avm()
+        return _chart(chart)(*args, display=display)
 
-    def res(self, percent=True):
+    def con(self, display=True):
+        """
+        Produce a contribution chart. A stacked chart of all the components
+        that make up the dependent variable
+
+        Parameters
+        ----------
+        display : Boolean, default True
+                show the chart, otherwise only return it
+        """
+        chart, args = self._con()
+        return _chart(chart)(*args, display=display)
+
+    def res(self, percent=True, display=True):
         """
         Produce a residual chart.
 
@@ -58,17 +119,13 @@ class ModelPlots:
         ----------
         percent : Boolean
                 display in percentage terms
+        display : Boolean, default True
+                show the chart, otherwise only return it
         """
+        chart, args = self._res(percent)
+        return _chart(chart)(*args, display=display)
 
-        resid = self._model.fitdetail.resid
-        if percent is True:
-            resid = self._model.fitdetail.resid.div(
-                self._model.fitdetail.model.endog)
-            resid.columns = ["Residuals"]
-        resid.name = "Residuals"
-        line(resid)
-
-    def plot(self, subset, dep=False, sample=True):
+    def plot(self, subset, dep=False, sample=True, display=True):
         """
         Produce a plot of the variable.
 
@@ -79,18 +136,263 @@ class ModelPlots:
         dep : Boolean, default False
                 plot variable against the dependent variable
         sample : True
-                only plot observations within the model sample period
+                only plot observations within the model sample period
+        display : Boolean, default True
+                show the chart, otherwise only return it
 
         """
         from pandas import concat
 
+        self._model.data.materialize(subset)
         df = self._model.data.ix[self._model.sample[0], subset]
         if dep is True:
             df = concat([self._model.depvar, df], axis=1)
-        line(df)
+        return line(df, display=display)
+
+    def export(self, folder, name="model", charts=("avm", "con", "res"),
+               formats=("html",), resources="cdn"):
+        """
+        Write the model's charts to files instead of showing them, see
+        export
+
+        Parameters
+        ----------
+        folder : string
+        name : string, default 'model'
+                prefix of the file names
+        charts : tuple, default ('avm', 'con', 'res')
+        formats : tuple, default ('html',)
+                'html' and, where selenium and a web driver are installed,
+                'png'
+        resources : string, default 'cdn'
+                'cdn' or 'inline' bokeh resources
+        """
+        return export({name: self._model}, folder, charts=charts,
+                      formats=formats, resources=resources)
+
+
+def _chart(name):
+    """the chart function called name, looked up when called so that
+    instrumented functions are used"""
+    return globals()[name]
+
+
+def _webdriver():
+    """a headless web driver for png export, or None if there is none"""
+    try:
+        from bokeh.io.webdriver import webdriver_control
+        return webdriver_control.create()
+    except Exception:
+        return None
+
+
+def _render(jobs, formats, resources):
+    """
+    internal function drawing charts and writing them to files. One set of
+    bokeh resources, and web driver when exporting png, is used for all the
+    charts a process renders.
+
+    Parameters
+    ----------
+    jobs : list of tuple
+            path without extension, chart function name and its arguments
+    formats : tuple
+    resources : string
+
+    Returns
+    -------
+    list of string
+            the files written
+    """
+    import os
+    from bokeh.embed import file_html
+    from bokeh.resources import CDN, INLINE
+
+    bokeh_resources = {"cdn": CDN, "inline": INLINE}[resources]
+    driver = _webdriver() if "png" in formats else None
+    written = []
+    try:
+        for path, chart, args in jobs:
+            plot = _chart(chart)(*args, display=False)
+            if "html" in formats:
+                with open(path + ".html", "w") as f:
+                    f.write(file_html(plot, bokeh_resources,
+                                      title=os.path.basename(path)))
+                written.append(path + ".html")
+            if driver is not None:
+                from bokeh.io import export_png
+                export_png(plot, filename=path + ".png", webdriver=driver)
+                written.append(path + ".png")
+    finally:
+        if driver is not None:
+            driver.quit()
+    return written
+
+
+def export(models, folder, charts=("avm", "con", "res"), formats=("html",),
+           resources="cdn", workers=1):
+    """
+    Write the charts of many fitted models to files without a browser or
+    notebook, e.g. in an overnight job. Files are named
+    ``{name}_{chart}.html`` and ``{name}_{chart}.png``.
+
+    Parameters
+    ----------
+    models : dict or list
+            fitted Model or EO objects, keyed by the name used in the file
+            names. A list is named by position
+    folder : string
+            created if it does not exist
+    charts : tuple, default ('avm', 'con', 'res')
+    formats : tuple, default ('html',)
+            'html' and, where selenium and a web driver are installed,
+            'png'. png files are skipped with a warning otherwise
+    resources : string, default 'cdn'
+            'cdn' links every file to the same cached bokeh scripts,
+            'inline' embeds them so files can be viewed offline
+    workers : int, default 1
+            number of processes to render charts in
+
+    Returns
+    -------
+    list of string
+            the files written
+    """
+    import os
+    from warnings import warn
+
+    if not isinstance(models, dict):
+        models = dict((str(i), m) for i, m in enumerate(models))
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    # chart data is computed here, only drawing and writing is parallel
+    jobs = []
+    for name, model in models.items():
+        plots = ModelPlots(getattr(model, "model", model))
+        for chart in charts:
+            function, args = getattr(plots, "_" + chart)()
+            jobs.append((os.path.join(folder, "{}_{}".format(name, chart)),
+                         function, args))
+
+    workers = min(workers, len(jobs))
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        chunks = [jobs[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render, chunk, formats, resources)
+                       for chunk in chunks]
+            written = [path for future in futures
+                       for path in future.result()]
+    else:
+        written = _render(jobs, formats, resources)
+
+    if "png" in formats and not any(x.endswith(".png") for x in written):
+        warn("png export needs selenium and a headless browser driver, "
+             "only html was written")
+    return sorted(written)
+
+
+def _lttb(x, Y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of every column of Y against
+    x. The first and last points are kept and from each bucket in between
+    the point forming the largest triangle with the point kept from the
+    previous bucket and the mean of the next bucket is chosen, which
+    preserves peaks and troughs of the series.
+
+    Parameters
+    ----------
+    x : array-like, shape (n_obs,)
+            increasing x values
+    Y : array-like, shape (n_obs, n_series)
+    n_out : int
+            points to keep per series
+
+    Returns
+    -------
+    ndarray, shape (n_out, n_series)
+            positions of the kept points of each series
+    """
+    import numpy as np
+
+    x = np.asarray(x, dtype=float)
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    n, m = Y.shape
+    if n_out is None or n_out >= n or n_out < 3:
+        return np.repeat(np.arange(n)[:, None], m, axis=1)
+
+    valid = ~np.isnan(Y)
+    filled = np.where(valid, Y, 0)
+    cols = np.arange(m)
+    every = (n - 2) / (n_out - 2)
+    kept = np.empty((n_out, m), dtype=np.intp)
+    kept[0] = 0
+    kept[-1] = n - 1
+    a = np.zeros(m, dtype=np.intp)
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        count = valid[end:next_end].sum(axis=0)
+        avg_x = x[end:next_end].mean()
+        avg_y = filled[end:next_end].sum(axis=0) / np.maximum(count, 1)
+        xa, ya = x[a], Y[a, cols]
+        area = np.abs((xa - avg_x) * (Y[start:end] - ya) -
+                      (xa - x[start:end, None]) * (avg_y - ya))
+        area[np.isnan(area)] = -1
+        a = start + area.argmax(axis=0)
+        kept[i + 1] = a
+    return kept
 
 
-def line(df, dep=None, namelist=None):
+def _shared_rows(x, Y, n_out):
+    """
+    Positions of the points kept for all series together, at most n_out of
+    them, so the series can share one source. A single series is downsampled
+    with LTTB. For several, the maximum and minimum of every series are kept
+    and the rest of the points are split between LTTB of the upper and of
+    the lower envelope of the series scaled to a common range.
+
+    Parameters
+    ----------
+    x : array-like, shape (n_obs,)
+    Y : array-like, shape (n_obs, n_series)
+    n_out : int
+
+    Returns
+    -------
+    ndarray
+            increasing positions
+    """
+    import numpy as np
+
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[:, None]
+    n, m = Y.shape
+    if n_out is None or n_out >= n:
+        return np.arange(n)
+    if m == 1:
+        return _lttb(x, Y, n_out)[:, 0]
+    missing = np.isnan(Y)
+    extremes = np.unique(np.r_[np.where(missing, -np.inf, Y).argmax(axis=0),
+                               np.where(missing, np.inf, Y).argmin(axis=0)])
+    per_envelope = (n_out - len(extremes)) // 2
+    if per_envelope < 3:
+        return extremes[:n_out]
+    low = np.fmin.reduce(Y, axis=0)
+    span = np.fmax.reduce(Y, axis=0) - low
+    scaled = (Y - low) / np.where(span > 0, span, 1)
+    envelope = np.column_stack([np.fmax.reduce(scaled, axis=1),
+                                np.fmin.reduce(scaled, axis=1)])
+    return np.unique(np.r_[extremes,
+                           _lttb(x, envelope, per_envelope).ravel()])
+
+
+def line(df, dep=None, namelist=None, max_points=2000, display=True):
     """
     takes dataframe and plots a line chart
 
@@ -99,9 +401,16 @@ def line(df, dep=None, namelist=None):
 
     df : the dataframe of series to chart
     namelist : a list of display names if variable names are not desirable
+    max_points : int, default 2000
+            series longer than this are downsampled to at most max_points
+            shared by all series with Largest-Triangle-Three-Buckets,
+            keeping the visual shape. None plots every point
+    display : Boolean, default True
+            show the chart, otherwise only return it
 
     """
     from pandas.core.series import Series
+    import bokeh.plotting as bk
     from bokeh.models import HoverTool, ColumnDataSource
 
     if namelist is not None:
@@ -109,12 +418,21 @@ def line(df, dep=None, namelist=None):
             df.name = namelist
         else:
             df.columns = namelist
+    if isinstance(df, Series):
+        colors = ['navy']
+        circle_colors, alpha = ['darkgrey'], 0.1
+        df = df.to_frame()
+    else:
+        colors = circle_colors = _colors
+        alpha = 0.2
+    # one glyph per variable reads its own column of the shared source,
+    # $name is the variable the hovered glyph draws
     hover = HoverTool(
         tooltips=[
             ("obs", "$index"),
-            ("Date", "@date"),
-            ("Value", "@y"),
-            ("Variable", "@variable")
+            ("Date", "@_date"),
+            ("Value", "@$name"),
+            ("Variable", "$name")
         ]
     )
 
@@ -124,46 +442,54 @@ def line(df, dep=None, namelist=None):
     plot.xgrid.grid_line_color = None
 
     obs = df.index.to_datetime()
-    if isinstance(df, Series):
-        source = ColumnDataSource({'x': obs, 'y': df.values,
-                                   'date': [x.strftime('%d %b %Y') for x in obs],
-                                   'variable': [df.name for x in obs]})
-        plot.circle('x', 'y', source=source, size=4, color='darkgrey',
-                    alpha=0.1, legend=df.name)
-        plot.line('x', 'y', source=source, color='navy', legend=df.name)
-    else:
-        for i, col in enumerate(df.columns):
-            source = ColumnDataSource({'x': obs, 'y': df[col].values,
-                                       'date': df.index.format(),
-                                       'variable': [df[col].name for x in obs]})
-            plot.circle('x', 'y', source=source, size=4, color=_colors[i],
-                        alpha=0.2, legend=col)
-            plot.line('x', 'y', source=source, color=_colors[i], legend=col)
-    bk.show(plot)
+    rows = _shared_rows(obs.asi8, df.values, max_points)
+    obs = obs[rows]
+    # the x values and dates are prefixed so no variable can replace them
+    data = {str(col): df[col].values[rows] for col in df.columns}
+    data.update({'_x': obs, '_date': obs.strftime('%d %b %Y')})
+    source = ColumnDataSource(data)
+    for i, col in enumerate(df.columns):
+        name = str(col)
+        plot.circle('_x', name, source=source, size=4, alpha=alpha,
+                    color=circle_colors[i % len(circle_colors)],
+                    legend=name, name=name)
+        plot.line('_x', name, source=source, color=colors[i % len(colors)],
+                  legend=name, name=name)
+    if display:
+        show(plot)
+    return plot
+
 
+def stackedBarAndLine(line, stackedbar, namelist=None, display=True):
+    """
+    TODO: Datetime index
 
-def stackedBarAndLine(line, stackedbar, namelist=None):
-    """TODO: Datetime index"""
+    Parameters
+    ----------
+    display : Boolean, default True
+            show the chart, otherwise only return it
+    """
     from pandas import DatetimeIndex
     import numpy as np
+    import bokeh.plotting as bk
+    from bokeh.core.properties import value
     from bokeh.models import HoverTool, ColumnDataSource, Range1d
 
     hover = HoverTool(
         tooltips=[
             ("obs", "$index"),
-            ("Date", "@obs_fmt"),
-            ("Value", "@y"),
-            ("Variable", "@variable")
+            ("Date", "@_date"),
+            ("Value", "@$name"),
+            ("Variable", "$name")
         ]
     )
 
     obs = stackedbar.index
     xrange = Range1d(start=obs[0], end=obs[-1])
     if isinstance(obs, DatetimeIndex):
-        obs_fmt = obs.map(lambda x: x.strftime('%d-%b-%y'))
-        obs_fmt = obs_fmt.tolist()
+        obs_fmt = obs.strftime('%d-%b-%y')
     else:
-        obs_fmt = obs.tolist()
+        obs_fmt = obs.values
 
     plot = bk.figure(plot_width=900, plot_height=500, x_range=xrange, tools=[hover, "pan", "wheel_zoom",
                                                                              "box_zoom", "reset"])
@@ -172,32 +498,37 @@ def stackedBarAndLine(line, stackedbar, namelist=None):
     plot.xaxis.axis_label = "Date"
     plot.yaxis.axis_label = "Contribution"
 
-    pos_sum = 0
-    neg_sum = 0
-    for i, contrib in enumerate(stackedbar):
-        name = contrib
-        contrib = stackedbar[contrib]
-        if contrib.max() > 0:
-            datasource = ColumnDataSource({'x': obs, 'y': pos_sum+contrib/2,
-                                           'obs_fmt': obs_fmt,
-                                           'variable': [str(name) for x in obs],
-                                           'color': [_colors[i] for x in obs],
-                                           'contrib': contrib})
-            plot.rect(x='x', y='y', source=datasource, width=7, height='contrib',
-                      color='color', alpha=0.6, legend=name, dilate=True)
-            pos_sum += contrib
-        else:
-            datasource = ColumnDataSource({'x': obs, 'y': neg_sum+contrib/2,
-                                           'obs_fmt': obs_fmt,
-                                           'variable': [str(name) for x in obs],
-                                           'color': [_colors[i] for x in obs],
-                                           'contrib': contrib})
-            plot.rect(x='x', y='y', source=datasource, width=7, height='contrib',
-                      color='color', alpha=0.6, legend=name)
-            neg_sum += contrib
-    datasource = ColumnDataSource({'x': obs, 'y': line, 'obs_fmt': obs_fmt,
-                                   'variable': [line.name for x in obs]})
-    plot.line(x='x', y='y', source=datasource, line_dash=[4, 4], color='#000000',
-              legend='variable')
+    if isinstance(obs, DatetimeIndex) and len(obs) > 1:
+        # bokeh measures datetime axes in milliseconds
+        width = 0.8 * np.median(np.diff(obs.asi8)) / 1e6
+    else:
+        width = 0.8
 
-    bk.show(plot)
+    # every contribution and the line share one source: a column of values
+    # named after the variable and its positive and negative parts, which
+    # are stacked above and below zero by one vbar_stack per sign. Internal
+    # columns are prefixed so no variable can replace them
+    names = [str(x) for x in stackedbar.columns]
+    values = np.nan_to_num(stackedbar.values.astype(float))
+    data = {'_x': obs, '_date': obs_fmt, str(line.name): np.asarray(line)}
+    for i, name in enumerate(names):
+        data[name] = values[:, i]
+        data['_pos_' + name] = np.maximum(values[:, i], 0)
+        data['_neg_' + name] = np.minimum(values[:, i], 0)
+    datasource = ColumnDataSource(data)
+
+    for sign, has in (('_pos_', (values > 0).any(axis=0)),
+                      ('_neg_', (values < 0).any(axis=0))):
+        parts = [i for i in range(len(names)) if has[i]]
+        if parts:
+            plot.vbar_stack([sign + names[i] for i in parts], x='_x',
+                            width=width, source=datasource, alpha=0.6,
+                            color=[_colors[i % len(_colors)] for i in parts],
+                            legend=[value(names[i]) for i in parts],
+                            name=[names[i] for i in parts])
+    plot.line(x='_x', y=str(line.name), source=datasource, line_dash=[4, 4],
+              color='#000000', legend=str(line.name), name=str(line.name))
+
+    if display:
+        show(plot)
+    return plot
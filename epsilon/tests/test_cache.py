@@ -0,0 +1,49 @@
+from numpy.testing import assert_array_equal
+from epsilon.cache import TransformCache
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='function')
+def cache():
+    return TransformCache(max_bytes=2 * 8 * 10)
+
+
+def test_hit_miss(cache):
+    key = cache.key([cache.digest(np.arange(3.))], "filter", 0.5, ())
+    if cache.get(key) is not None:
+        raise AssertionError
+    cache.put(key, np.ones(10))
+    assert_array_equal(cache.get(key), np.ones(10))
+    stats = cache.stats()
+    if (stats["hits"], stats["misses"]) != (1, 1):
+        raise AssertionError
+
+
+def test_key_depends_on_content(cache):
+    a = cache.key([cache.digest(np.arange(3.))], "filter", 0.5, ())
+    b = cache.key([cache.digest(np.arange(3.) + 1)], "filter", 0.5, ())
+    c = cache.key([cache.digest(np.arange(3.))], "filter", 0.4, ())
+    if len({a, b, c}) != 3:
+        raise AssertionError
+
+
+def test_lru_eviction(cache):
+    cache.put("a", np.ones(10))
+    cache.put("b", np.ones(10))
+    cache.get("a")
+    cache.put("c", np.ones(10))
+    if cache.get("b") is not None or cache.get("a") is None:
+        raise AssertionError
+    if cache.stats()["evictions"] != 1:
+        raise AssertionError
+
+
+def test_spill(cache, tmpdir):
+    cache.spill_dir = str(tmpdir)
+    cache.put("a", np.arange(10.))
+    cache.put("b", np.ones(10))
+    cache.put("c", np.ones(10))
+    assert_array_equal(cache.get("a"), np.arange(10.))
+    if cache.stats()["disk_hits"] != 1:
+        raise AssertionError
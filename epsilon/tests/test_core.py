@@ -0,0 +1,74 @@
+from numpy.testing import assert_array_equal
+from epsilon.core import EO
+import pandas as pd
+import pytest
+
+
+@pytest.fixture(scope='function')
+def project(tmpdir, monkeypatch):
+    tmpdir.mkdir("data")
+    monkeypatch.chdir(tmpdir)
+    return tmpdir
+
+
+@pytest.fixture(scope='function')
+def df():
+    df = pd.DataFrame({'Sales': [1., 3., 2., 5.], 'TV Spend': [0., 2., 1., 4.]},
+                      index=["1999-01-02", "1999-01-09", "1999-01-16",
+                             "1999-01-23"])
+    return df
+
+
+# test that reset restores the cleaned data from the snapshot
+def test_reset(project, df):
+    eo = EO(df, snapshot="data/rawdata.arrow")
+    if not project.join("data", "rawdata.arrow").check():
+        raise AssertionError
+    eo.data.adstock('tv_spend', 0.5)
+    eo.reset()
+    if eo.data.columns.tolist() != ['sales', 'tv_spend']:
+        raise AssertionError
+    assert_array_equal(eo.data['tv_spend'], [0., 2., 1., 4.])
+    if eo.model.data is not eo.data:
+        raise AssertionError
+
+
+# test that reset can page in a subset of columns
+def test_reset_columns(project, df):
+    eo = EO(df, snapshot="data/rawdata.arrow")
+    eo.reset(columns=['sales'])
+    if eo.data.columns.tolist() != ['sales']:
+        raise AssertionError
+
+
+# test that every instance resets from its own snapshot
+def test_reset_own_snapshot(project, df):
+    north = EO(df, snapshot="data/north.arrow")
+    south = EO(df[['Sales']].rename(columns={'Sales': 'Revenue'}),
+               snapshot="data/south.arrow")
+    north.reset()
+    south.reset()
+    if north.data.columns.tolist() != ['sales', 'tv_spend']:
+        raise AssertionError
+    if south.data.columns.tolist() != ['revenue']:
+        raise AssertionError
+
+
+# test that a later snapshot holds only the source columns
+def test_snapshot_after_transform(project, df):
+    eo = EO(df)
+    eo.data.adstock('tv_spend', 0.5)
+    eo.snapshot("data/rawdata.arrow")
+    eo.reset()
+    if eo.data.columns.tolist() != ['sales', 'tv_spend']:
+        raise AssertionError
+    eo.data['sales'] = 0.
+    with pytest.raises(ValueError):
+        eo.snapshot("data/rawdata.arrow")
+
+
+# test that no snapshot is written unless one is asked for
+def test_no_snapshot(project, df):
+    EO(df)
+    if project.join("data").listdir():
+        raise AssertionError
@@ -0,0 +1,141 @@
+from numpy.testing import assert_array_equal, assert_allclose
+from epsilon.data import Data
+import pandas as pd
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='function')
+def df():
+    values = [[10., 1., 0.], [12., 0., 2.], [11., 3., 1.], [15., 2., 0.]]
+    df = pd.DataFrame(values,
+                      index=["1999-01-02", "1999-01-09", "1999-01-16",
+                             "1999-01-23"],
+                      columns=['Sales', 'TV', 'Radio'])
+    return df
+
+
+def test_adstock_values(df):
+    data = Data(df)
+    data.adstock('tv', 0.5)
+    assert_array_equal(data['tv_adstock0.5'], [1., 0.5, 3.25, 3.625])
+
+
+def test_adstock_names(df):
+    data = Data(df)
+    data.adstock(['tv', 'radio'], [0.9, 0.5])
+    new = data.columns.tolist()[3:]
+    if new != ['tv_adstock' + str(1 - 0.9), 'radio_adstock' + str(1 - 0.9),
+               'tv_adstock0.5', 'radio_adstock0.5']:
+        raise AssertionError
+
+
+def test_atan_values(df):
+    data = Data(df)
+    data.atan('tv', [0.5, 1])
+    assert_allclose(data['tv_atan1'],
+                    np.arctan(df['TV'].values / 3.) / (np.pi / 2))
+
+
+def test_pow_values(df):
+    data = Data(df)
+    data.pow(['tv', 'radio'], 2)
+    assert_array_equal(data['radio**2'], [0., 4., 1., 0.])
+
+
+def test_lag_values(df):
+    data = Data(df)
+    data.lag('tv', 1, 0)
+    data.lag('tv', -2, 9)
+    assert_array_equal(data['tv_lag1'], [0., 1., 0., 3.])
+    assert_array_equal(data['tv_lag-2'], [3., 2., 9., 9.])
+
+
+def test_not_inplace(df):
+    data = Data(df)
+    result = data.atan('tv', 0.5, inplace=False)
+    if 'tv_atan0.5' in data.columns or 'tv_atan0.5' not in result.columns:
+        raise AssertionError
+
+
+def test_lazy_pending(df):
+    data = Data(df, lazy=True)
+    data.adstock('tv', 0.5)
+    data.atan('tv_adstock0.5', 0.5)
+    if 'tv_adstock0.5_atan0.5' in data.columns:
+        raise AssertionError
+    if 'tv_adstock0.5_atan0.5' not in data.all_columns():
+        raise AssertionError
+
+
+def test_lazy_matches_eager(df):
+    eager = Data(df.copy())
+    eager.adstock('tv', 0.5)
+    eager.atan('tv_adstock0.5', 0.5)
+    lazy = Data(df.copy(), lazy=True)
+    lazy.adstock('tv', 0.5)
+    lazy.atan('tv_adstock0.5', 0.5)
+    assert_allclose(lazy['tv_adstock0.5_atan0.5'],
+                    eager['tv_adstock0.5_atan0.5'])
+    if 'tv_adstock0.5' not in lazy.columns:
+        raise AssertionError
+
+
+def test_lazy_shared(df):
+    data = Data(df, lazy=True)
+    data.atan('tv', 0.5)
+    data.atan(['tv', 'radio'], 0.5)
+    if len(data._graph) != 2:
+        raise AssertionError
+
+
+def test_cache_reused(df):
+    import epsilon.cache
+    epsilon.cache.clear()
+    Data(df.copy()).adstock('tv', 0.5)
+    data = Data(df.copy())
+    data.adstock('tv', 0.5)
+    if epsilon.cache.stats()["hits"] != 1:
+        raise AssertionError
+    assert_array_equal(data['tv_adstock0.5'], [1., 0.5, 3.25, 3.625])
+
+
+def test_profile(df):
+    df['Flat'] = 1.
+    df['Region'] = ['a', 'b', 'a', None]
+    data = Data(df)
+    stats = data.profile()
+    if list(stats.index) != ['sales', 'tv', 'radio', 'flat', 'region']:
+        raise AssertionError
+    assert_allclose(stats.loc[['sales', 'tv', 'radio'], 'std'],
+                    df[['Sales', 'TV', 'Radio']].std())
+    assert_array_equal(stats['nunique'], [4, 4, 3, 1, 2])
+    assert_array_equal(stats['nulls'], [0, 0, 0, 0, 1])
+    assert_array_equal(stats['varying'], [True, True, True, False, True])
+    assert_array_equal(stats['numeric'], [True, True, True, True, False])
+
+
+def test_profile_incremental(df):
+    data = Data(df)
+    stats = data.profile()
+    data.adstock('tv', 0.5)
+    data['radio'] = 0.
+    updated = data.profile()
+    if updated.loc['tv', 'std'] != stats.loc['tv', 'std']:
+        raise AssertionError
+    if updated.loc['tv_adstock0.5', 'max'] != 3.625:
+        raise AssertionError
+    if updated.loc['radio', 'varying'] or len(updated) != 4:
+        raise AssertionError
+
+
+def test_profile_inplace(df):
+    df.iloc[1, 2] = np.nan
+    data = Data(df)
+    if data.profile(nunique=False)['nunique'].notnull().any():
+        raise AssertionError
+    data.fillna(1., inplace=True)
+    stats = data.profile()
+    if stats.loc['radio', 'nulls'] != 0:
+        raise AssertionError
+    assert_array_equal(stats['nunique'], [4, 4, 2])
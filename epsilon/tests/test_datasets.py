@@ -0,0 +1,55 @@
+from numpy.testing import assert_array_equal, assert_allclose
+from epsilon.datasets import mmm
+from epsilon.core import EO
+import pytest
+
+
+@pytest.fixture(scope='module')
+def dataset():
+    return mmm(weeks=260, regions=1, channels=3, noise=0.01, seed=3)
+
+
+def test_shape():
+    df, truth = mmm(weeks=52, regions=3, channels=4, extra=5)
+    if df.shape != (52, 3 * (3 + 4 + 5)):
+        raise AssertionError
+    if len(truth["coefficients"]) != 12:
+        raise AssertionError
+
+
+def test_seeded():
+    a, _ = mmm(weeks=52, seed=7)
+    b, _ = mmm(weeks=52, seed=7)
+    assert_array_equal(a.values, b.values)
+
+
+# test that ols on the true transformations recovers the true coefficients
+def test_recovery(dataset):
+    df, truth = dataset
+    eo = EO(df)
+    eo.model.dep(truth["sales"][0])
+    eo.model.add(["region0_season", "region0_promo"])
+    names = []
+    for var in truth["media"]:
+        adstock = truth["adstock"][var]
+        eo.data.adstock(var, adstock)
+        name = var + "_adstock" + str(1 - adstock)
+        eo.data.atan(name, truth["alpha"][var])
+        names.append(name + "_atan" + str(truth["alpha"][var]))
+    eo.model.add(names)
+    eo.model.ols(summary=False)
+    estimates = eo.model.fitdetail.params[names].values
+    assert_allclose(estimates, truth["coefficients"].values, rtol=0.05)
+
+
+def test_workbooks(tmpdir, monkeypatch):
+    import epsilon._parser
+    from epsilon.datasets import to_workbooks
+    # keep the fragments cache out of the user's cache folder
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir.mkdir("cache")))
+    df, truth = mmm(weeks=52, regions=2, channels=2)
+    folder = tmpdir.mkdir("workbooks")
+    to_workbooks(df, truth, str(folder))
+    eo = epsilon._parser.read_folder(str(folder))
+    if sorted(eo.data.columns) != sorted(df.columns):
+        raise AssertionError
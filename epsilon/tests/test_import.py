@@ -0,0 +1,39 @@
+import subprocess
+import sys
+
+# seconds importing epsilon may add on top of its core dependencies
+BUDGET = 0.5
+
+_script = """
+import sys
+import time
+import numpy
+import pandas
+loaded = set(sys.modules)
+start = time.time()
+import epsilon.core
+import epsilon.plotting
+print(time.time() - start)
+print(",".join(sorted(name for name in ("bokeh", "statsmodels", "pyarrow",
+                                        "scipy")
+                      if name in sys.modules and name not in loaded)))
+"""
+
+
+def _import():
+    out = subprocess.check_output([sys.executable, "-c", _script],
+                                  universal_newlines=True)
+    seconds, modules = out.split("\n")[:2]
+    return float(seconds), modules
+
+
+def test_import_is_lazy():
+    _, modules = _import()
+    if modules != "":
+        raise AssertionError(modules)
+
+
+def test_import_budget():
+    seconds, _ = _import()
+    if seconds > BUDGET:
+        raise AssertionError(seconds)
@@ -0,0 +1,67 @@
+from epsilon.core import EO
+from epsilon.model import Model
+from epsilon import _instrument
+import pandas as pd
+import numpy as np
+import json
+import pytest
+
+
+@pytest.fixture(scope='function')
+def eo():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(20, 3),
+                      index=pd.date_range("1999-01-02", periods=20,
+                                          freq="7D").astype(str),
+                      columns=['Sales', 'TV', 'Radio'])
+    eo = EO(df)
+    yield eo
+    eo.instrument(False)
+    _instrument.reset()
+
+
+def test_disabled_is_unwrapped(eo):
+    if hasattr(Model.ols, "_original"):
+        raise AssertionError
+
+
+def test_stats(eo):
+    eo.instrument(memory=True)
+    eo.model.dep('sales')
+    eo.model.add('tv')
+    eo.model.ols(summary=False)
+    stats = eo.stats()
+    if stats.loc["Model.ols", "calls"] != 1:
+        raise AssertionError
+    if stats.loc["Model._get_exog", "rows"] != 20:
+        raise AssertionError
+    eo.instrument(False)
+    if hasattr(Model.ols, "_original"):
+        raise AssertionError
+
+
+def test_trace(eo, tmpdir):
+    eo.instrument()
+    eo.model.dep('sales')
+    path = str(tmpdir.join("trace.json"))
+    eo.trace(path)
+    with open(path) as f:
+        events = json.load(f)["traceEvents"]
+    if events[0]["name"] != "Model.dep" or events[0]["ph"] != "X":
+        raise AssertionError
+
+
+def test_user_tracemalloc(eo):
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        eo.instrument(memory=True)
+        eo.instrument(False)
+        if not tracemalloc.is_tracing():
+            raise AssertionError
+    finally:
+        tracemalloc.stop()
+    eo.instrument(memory=True)
+    eo.instrument(False)
+    if tracemalloc.is_tracing():
+        raise AssertionError
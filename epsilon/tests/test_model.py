@@ -1,4 +1,4 @@
-from numpy.testing import assert_array_equal
+from numpy.testing import assert_array_equal, assert_array_almost_equal
 from epsilon.core import EO
 import pandas as pd
 import numpy as np
@@ -71,3 +71,377 @@ def test_obs_vals(eo):
     assert_array_equal(eo.model.obs(),
                        pd.date_range(start="1999-01-01",
                                      end="1999-01-02"))
+
+
+@pytest.fixture(scope='function')
+def weekly():
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.rand(30, 4) * 10,
+                      index=pd.date_range("1999-01-02", periods=30,
+                                          freq="7D").astype(str),
+                      columns=['Sales', 'TV', 'Radio', 'Press'])
+    return df
+
+
+# test that preview statistics match fitting each candidate in turn
+def test_preview_matches_refit(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add('tv')
+    preview = eo.model.preview()
+    for var in ['radio', 'press']:
+        eo.model.add(var)
+        eo.model.ols(refit=True)
+        assert_array_almost_equal(
+            preview.loc[var, ["coefficient", "t-stat", "PValue",
+                              "Adjusted Rsquared"]].values,
+            [eo.model.fitdetail.params[var], eo.model.fitdetail.tvalues[var],
+             eo.model.fitdetail.pvalues[var],
+             eo.model.fitdetail.rsquared_adj])
+        eo.model.rem(var)
+
+
+# test that the incremental fit matches a fit from scratch
+def test_ols_incremental(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add(['tv', 'radio'])
+    eo.model.ols()
+    eo.model.rem('tv')
+    eo.model.add('press')
+    eo.model.ols()
+    params = eo.model.fitdetail.params
+    eo.model.ols(refit=True)
+    assert_array_almost_equal(params[eo.model.fitdetail.params.index],
+                              eo.model.fitdetail.params)
+
+
+# test that overwritten variables are entered again without a refit
+def test_ols_overwritten(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add(['tv', 'radio'])
+    eo.model.ols()
+    state = eo.model._ols_state
+    eo.data.adstock('press', 0.5)
+    eo.model.add('press_adstock0.5')
+    eo.model.ols()
+    if eo.model._ols_state is not state:
+        raise AssertionError
+    eo.data['tv'] = eo.data['tv'] ** 2
+    eo.model.ols()
+    params = eo.model.fitdetail.params
+    eo.model.ols(refit=True)
+    assert_array_almost_equal(params[eo.model.fitdetail.params.index],
+                              eo.model.fitdetail.params)
+    eo.data['sales'] = eo.data['sales'] * 2
+    eo.model.ols()
+    assert_array_almost_equal(eo.model.fitdetail.params,
+                              params[eo.model.fitdetail.params.index] * 2)
+
+
+# test that lazily transformed variables are computed when modelled
+def test_lazy_ols(weekly):
+    eo = EO(weekly, lazy=True)
+    eo.model.dep('sales')
+    eo.data.adstock('tv', 0.5)
+    eo.model.add('tv_adstock0.5')
+    if 'tv_adstock0.5' in eo.data.columns:
+        raise AssertionError
+    eo.model.ols()
+    if 'tv_adstock0.5' not in eo.model.fitdetail.params:
+        raise AssertionError
+
+
+# test that the summary is only built when displayed
+def test_ols_lazy_summary(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add('tv')
+    summary = eo.model.ols()
+    if summary._summary is not None:
+        raise AssertionError
+    if "OLS Regression Results" not in str(summary):
+        raise AssertionError
+    if eo.model.ols(summary=False) is not eo.model.fitdetail:
+        raise AssertionError
+
+
+# test that statsmodels fits store a lightweight result
+def test_rlm_fitdetail(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add('tv')
+    eo.model.rlm(summary=False)
+    if 'tv' not in eo.model.fitdetail.params:
+        raise AssertionError
+    if len(eo.model.fitdetail.resid) != 30:
+        raise AssertionError
+
+
+# test that fitting several targets matches fitting each one in turn
+def test_multi_target(weekly):
+    weekly.iloc[0, 1] = np.nan
+    eo = EO(weekly)
+    eo.model.dep(['sales', 'tv'])
+    eo.model.add(['radio', 'press'])
+    eo.model.ols(summary=False)
+    multi = eo.model.fitdetail
+    if 'tv' in eo.model.variables_out or multi.nobs != 29:
+        raise AssertionError
+    for target in ['sales', 'tv']:
+        single = EO(weekly.iloc[1:])
+        single.model.dep(target)
+        single.model.add(['radio', 'press'])
+        single.model.ols(summary=False)
+        fit = single.model.fitdetail
+        assert_array_almost_equal(multi.params[target].values,
+                                  fit.params.values)
+        assert_array_almost_equal(multi.bse[target].values, fit.bse.values)
+        assert_array_almost_equal(multi.rsquared_adj[target],
+                                  fit.rsquared_adj)
+        assert_array_almost_equal(multi[target].tvalues.values,
+                                  fit.tvalues.values)
+    eo.model.dep('tv')
+    eo.model.add('sales')
+    if eo.model.targets != ['tv'] or eo.model.depvar.name != 'tv':
+        raise AssertionError
+
+
+# test switching from several dependent variables back to one of them
+def test_multi_target_to_single(weekly):
+    eo = EO(weekly)
+    eo.model.dep(['sales', 'tv'])
+    eo.model.add('radio')
+    with pytest.raises(ValueError):
+        eo.model.dep('missing')
+    if eo.model.targets != ['sales', 'tv']:
+        raise AssertionError
+    eo.model.dep('sales')
+    if eo.model.targets != ['sales'] or eo.model.depvar.name != 'sales':
+        raise AssertionError
+    if 'tv' not in eo.model.variables_out:
+        raise AssertionError
+    eo.model.ols(summary=False)
+    if list(eo.model.fitdetail.params.index) != ['const', 'radio']:
+        raise AssertionError
+
+
+# test that rolling and expanding windows match refitting each window
+@pytest.mark.parametrize('window', [None, 12])
+def test_rolling_matches_refit(weekly, window):
+    import statsmodels.api as sm
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add(['tv', 'radio'])
+    paths = eo.model.rolling(window=window)
+    x = sm.add_constant(weekly[['TV', 'Radio']])
+    for end in [5, 17, 30]:
+        if window is not None and end < window:
+            continue
+        start = 0 if window is None else end - window
+        fit = sm.OLS(weekly['Sales'].iloc[start:end], x.iloc[start:end]).fit()
+        row = paths["params"].index[end - len(weekly) - 1]
+        names = ['const', 'tv', 'radio']
+        assert_array_almost_equal(paths["params"].loc[row, names].values,
+                                  fit.params.values)
+        assert_array_almost_equal(paths["tvalues"].loc[row, names].values,
+                                  fit.tvalues.values)
+        assert_array_almost_equal(paths["rsquared"][row], fit.rsquared)
+
+
+def test_rolling_window_min_obs(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add('tv')
+    with pytest.raises(ValueError):
+        eo.model.rolling(window=12, min_obs=5)
+
+
+# test that scenario forecasts match rebuilding the data with the new values
+def test_forecast_matches_rebuild(weekly):
+    def build(df):
+        eo = EO(df)
+        eo.data.adstock('tv', 0.5)
+        eo.data.pow('tv_adstock0.5', 0.5)
+        eo.model.dep('sales')
+        eo.model.add(['tv_adstock0.5**0.5', 'radio'])
+        eo.model.ols()
+        return eo
+
+    eo = build(weekly)
+    rng = np.random.RandomState(1)
+    scenarios = rng.rand(3, 4, 2) * 10
+    forecast = eo.model.forecast(scenarios, ['tv', 'radio'])
+    params = eo.model.fitdetail.params
+    assert_array_almost_equal(forecast["baseline"],
+                              eo.model.fitdetail.fittedvalues.values[-4:])
+    for i in range(3):
+        changed = weekly.copy()
+        changed.iloc[-4:, 1:3] = scenarios[i]
+        data = build(changed).data
+        expected = params["const"] + data[params.index[1:]].dot(
+            params.values[1:])
+        assert_array_almost_equal(forecast["prediction"][i],
+                                  expected.values[-4:])
+
+
+# test forecasts of saturations scaled by the maximum of the history
+def test_forecast_scaled_saturation(weekly):
+    # the peak of both channels is before the scenario weeks, so rebuilding
+    # the data keeps the scaling the model was estimated with
+    weekly.iloc[0, 1:3] = 100.
+
+    def build(df):
+        eo = EO(df)
+        eo.data.adstock('tv', 0.5)
+        eo.data.atan('tv_adstock0.5', 0.3)
+        eo.data.hill('radio', 0.2, shape=2)
+        eo.model.dep('sales')
+        eo.model.add(['tv_adstock0.5_atan0.3', eo.data.all_columns()[-1]])
+        eo.model.ols()
+        return eo
+
+    eo = build(weekly)
+    scenarios = np.random.RandomState(1).rand(3, 4, 2) * 10
+    forecast = eo.model.forecast(scenarios, ['tv', 'radio'])
+    params = eo.model.fitdetail.params
+    for i in range(3):
+        changed = weekly.copy()
+        changed.iloc[-4:, 1:3] = scenarios[i]
+        data = build(changed).data
+        expected = params["const"] + data[params.index[1:]].dot(
+            params.values[1:])
+        assert_array_almost_equal(forecast["prediction"][i],
+                                  expected.values[-4:])
+    with pytest.raises(ValueError):
+        eo.model.forecast(scenarios[:, :, :1], ['press'])
+
+
+@pytest.fixture(scope='function')
+def media():
+    from epsilon.datasets import mmm
+    df, truth = mmm(weeks=104, regions=1, channels=3, seed=2)
+    eo = EO(df)
+    channels = truth["media"]
+    for var in channels:
+        eo.data.adstock(var, truth["adstock"][var])
+        eo.data.atan(eo.data.all_columns()[-1], truth["alpha"][var])
+    eo.model.dep("region0_sales")
+    eo.model.add([x for x in eo.data.all_columns() if "_atan" in x])
+    eo.model.ols()
+    return eo, df, channels
+
+
+# test that the gradient of the prediction matches finite differences
+def test_gradient_matches_differences(media):
+    from epsilon._simulate import gradient
+    eo, df, channels = media
+    args = (eo.data._graph, eo.data._fetch, eo.model.fitdetail.params,
+            channels)
+    plan = df[channels].values[-26:] + 100
+    total, grad = gradient(*args, plan=plan, start=78)
+    numeric = np.zeros(plan.shape)
+    for w, c in [(0, 0), (5, 1), (25, 2)]:
+        step = np.zeros(plan.shape)
+        step[w, c] = 1.
+        numeric[w, c] = (gradient(*args, plan=plan + step, start=78)[0] -
+                         gradient(*args, plan=plan - step, start=78)[0]) / 2
+        assert_array_almost_equal(numeric[w, c], grad[w, c])
+
+
+# test that allocations spend the budget within bounds and beat history
+def test_optimize(media):
+    eo, df, channels = media
+    history = df[channels].values[-52:].sum(axis=0)
+    budgets = [history.sum() * x for x in [0.5, 1., 2.]]
+    bounds = {channels[0]: (None, history[0])}
+    result = eo.model.optimize(budgets, channels, bounds=bounds)
+    assert_array_almost_equal(result[channels].sum(axis=1) / budgets,
+                              np.ones(3))
+    if (result[channels[0]] > history[0] + 1e-6).any():
+        raise AssertionError("channel bound exceeded")
+    fixed = eo.model.optimize(budgets[1], channels,
+                              bounds=dict(zip(channels, zip(history,
+                                                            history))))
+    if result["contribution"].iloc[1] < fixed["contribution"].iloc[0]:
+        raise AssertionError("optimised allocation is worse than history")
+    zero = eo.model.optimize([0., budgets[0]], channels)
+    assert_array_almost_equal(zero.iloc[0][channels + ["contribution"]],
+                              np.zeros(len(channels) + 1))
+    with pytest.raises(ValueError):
+        eo.model.optimize(-1., channels)
+
+
+# test that fixed coefficients match a fit of the adjusted dependent variable
+def test_fix_offset(weekly):
+    import statsmodels.api as sm
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add(['tv', 'radio'])
+    eo.model.ols()
+    columns = eo.data.columns
+    for value in [0.5, -0.2, 2.0]:
+        eo.model.fix('radio', value)
+        eo.model.ols()
+        x = sm.add_constant(weekly[['TV']])
+        fit = sm.OLS(weekly['Sales'] - value * weekly['Radio'], x).fit()
+        assert_array_almost_equal(eo.model.fitdetail.params.values,
+                                  fit.params.values)
+        assert_array_almost_equal(eo.model.fitdetail.rsquared, fit.rsquared)
+        assert_array_almost_equal(eo.model.fitdetail.rsquared_adj,
+                                  fit.rsquared_adj)
+        assert_array_almost_equal(eo.model.fitdetail.predict(),
+                                  fit.fittedvalues + value * weekly['Radio'])
+        assert_array_almost_equal(eo.model.fitdetail.predict(x.values),
+                                  fit.fittedvalues)
+        contributions = eo.model.fitdetail.contributions()
+        assert_array_almost_equal(contributions["radio"],
+                                  value * weekly['Radio'])
+        preview = eo.model.preview()
+        assert_array_almost_equal(
+            preview.loc['press', 'coefficient'],
+            sm.OLS(weekly['Sales'] - value * weekly['Radio'],
+                   sm.add_constant(weekly[['TV', 'Press']])).fit()
+            .params['Press'])
+        if 'radio' in preview.index:
+            raise AssertionError("fixed variable previewed")
+    if list(eo.data.columns) != list(columns):
+        raise AssertionError("fixing added columns to the data")
+    eo.model.unfix()
+    eo.model.ols()
+    if 'radio' not in eo.model.fitdetail.params:
+        raise AssertionError("unfixed variable not estimated")
+
+
+# test that robust fits add the fixed terms to the fitted values only
+def test_fix_predict_rlm(weekly):
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add(['tv', 'radio'])
+    eo.model.fix('radio', 0.5)
+    eo.model.rlm(summary=False)
+    fitdetail = eo.model.fitdetail
+    assert_array_almost_equal(fitdetail.predict(),
+                              weekly['Sales'].values - fitdetail.resid.values)
+    x = fitdetail.model.exog
+    assert_array_almost_equal(fitdetail.predict(x),
+                              x.dot(fitdetail.params.values))
+
+
+# test that the offset follows new values of a fixed variable
+def test_fix_offset_stale(weekly):
+    import statsmodels.api as sm
+    eo = EO(weekly)
+    eo.model.dep('sales')
+    eo.model.add(['tv', 'radio'])
+    eo.model.fix('radio', 0.5)
+    eo.model.ols()
+    radio = weekly['Radio'].values[::-1]
+    eo.data['radio'] = radio
+    eo.model.ols()
+    fit = sm.OLS(weekly['Sales'].values - 0.5 * radio,
+                 sm.add_constant(weekly[['TV']].values)).fit()
+    assert_array_almost_equal(eo.model.fitdetail.params.values, fit.params)
+    assert_array_almost_equal(eo.model.fitdetail.contributions()["radio"],
+                              0.5 * radio)
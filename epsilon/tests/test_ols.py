@@ -0,0 +1,117 @@
+from numpy.testing import assert_allclose
+from epsilon._ols import partial_regressions, IncrementalOLS, OLSResult
+import numpy as np
+import pytest
+
+
+def _full_fit(X, y):
+    # reference statistics from an explicit least squares fit
+    from scipy import stats
+    params = np.linalg.lstsq(X, y, rcond=None)[0]
+    resid = y - X.dot(params)
+    df_resid = X.shape[0] - X.shape[1]
+    sigma2 = resid.dot(resid) / df_resid
+    bse = np.sqrt(np.diag(np.linalg.inv(X.T.dot(X))) * sigma2)
+    tvalues = params / bse
+    rsquared = 1 - resid.dot(resid) / np.sum((y - y.mean()) ** 2)
+    rsquared_adj = 1 - (len(y) - 1) / df_resid * (1 - rsquared)
+    return (params, tvalues, 2 * stats.t.sf(np.abs(tvalues), df_resid),
+            rsquared_adj)
+
+
+@pytest.fixture(scope='module')
+def design():
+    rng = np.random.RandomState(1)
+    X = np.column_stack([np.ones(40), rng.rand(40, 2)])
+    Z = rng.rand(40, 4)
+    y = X.dot([1., 2., -1.]) + Z[:, 0] + rng.rand(40)
+    return X, y, Z
+
+
+def test_partial_matches_full_fit(design):
+    X, y, Z = design
+    stats = partial_regressions(X, y, Z)
+    for j in range(Z.shape[1]):
+        params, tvalues, pvalues, rsquared_adj = _full_fit(
+            np.column_stack([X, Z[:, j]]), y)
+        assert_allclose(stats["params"][j], params[-1])
+        assert_allclose(stats["tvalues"][j], tvalues[-1])
+        assert_allclose(stats["pvalues"][j], pvalues[-1])
+        assert_allclose(stats["rsquared_adj"][j], rsquared_adj)
+
+
+def test_partial_collinear(design):
+    X, y, Z = design
+    stats = partial_regressions(X, y, X[:, 1:2] * 2)
+    if stats["params"][0] != 0:
+        raise AssertionError
+
+
+def test_incremental_matches_lstsq(design):
+    X, y, Z = design
+    state = IncrementalOLS(y)
+    for i in range(X.shape[1]):
+        state.add(i, X[:, i])
+    state.add("z0", Z[:, 0])
+    state.add("z1", Z[:, 1])
+    state.drop(1)
+    state.add("z2", Z[:, 2])
+    state.drop("z1")
+    design = np.column_stack([X[:, 0], X[:, 2], Z[:, 0], Z[:, 2]])
+    fit = state.fit()
+    assert_allclose(fit["params"],
+                    np.linalg.lstsq(design, y, rcond=None)[0])
+    assert_allclose(fit["normalized_cov_params"],
+                    np.linalg.inv(design.T.dot(design)))
+    if state.refactors != 0:
+        raise AssertionError
+
+
+def test_incremental_scaled_columns(design):
+    # spend in the millions next to a constant
+    X, y, Z = design
+    spend = Z * [2e6, 5e6, 1e7, 4e6]
+    state = IncrementalOLS(y * 1e4)
+    state.add("const", X[:, 0])
+    for j in range(3):
+        state.add(j, spend[:, j])
+    state.fit()
+    state.drop(1)
+    state.add(3, spend[:, 3])
+    fit = state.fit()
+    design = np.column_stack([X[:, 0], spend[:, [0, 2, 3]]])
+    assert_allclose(fit["params"],
+                    np.linalg.lstsq(design, y * 1e4, rcond=None)[0])
+    if state.refactors != 0:
+        raise AssertionError
+
+
+def test_incremental_collinear_refactors(design):
+    X, y, Z = design
+    state = IncrementalOLS(y)
+    state.add("const", X[:, 0])
+    state.add("x1", X[:, 1])
+    state.add("x1 copy", X[:, 1])
+    fit = state.fit()
+    if state.refactors == 0:
+        raise AssertionError
+    assert_allclose(fit["params"], np.linalg.pinv(X[:, :2].repeat(
+        [1, 2], axis=1)).dot(y))
+
+
+def test_result_matches_statsmodels(design):
+    import pandas as pd
+    import statsmodels.api as sm
+    X, y, Z = design
+    exog = pd.DataFrame(X, columns=["const", "x1", "x2"])
+    endog = pd.Series(y, name="y")
+    state = IncrementalOLS(y)
+    for col in exog:
+        state.add(col, exog[col].values)
+    result = OLSResult(exog, endog, **state.fit())
+    expected = sm.OLS(endog, exog).fit()
+    assert_allclose(result.params, expected.params)
+    assert_allclose(result.bse, expected.bse)
+    assert_allclose(result.pvalues, expected.pvalues)
+    assert_allclose(result.rsquared_adj, expected.rsquared_adj)
+    assert_allclose(result.resid, expected.resid)
@@ -0,0 +1,75 @@
+from numpy.testing import assert_allclose
+from epsilon.datasets import mmm
+from epsilon.panel import Panel
+import statsmodels.api as sm
+import pandas as pd
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def regions():
+    df, truth = mmm(weeks=104, regions=5, channels=3, seed=3)
+    df.iloc[:4, 0] = np.nan
+    return df, truth
+
+
+@pytest.fixture(scope='function')
+def panel(regions):
+    df, truth = regions
+    panel = Panel(df, truth["regions"])
+    panel.transform("adstock", ["media_0", "media_1"], 0.5)
+    panel.dep("sales")
+    panel.add(["season", "promo", "media_0_adstock0.5", "media_1_adstock0.5"])
+    return panel
+
+
+def _design(panel, unit):
+    columns = [unit + "_" + x for x in panel.variables_in]
+    df = panel.data[columns + [unit + "_sales"]].dropna()
+    return df[unit + "_sales"], df[columns]
+
+
+def test_unit_matches_ols(panel):
+    result = panel.fit(effects="unit")
+    for unit in panel.units:
+        y, X = _design(panel, unit)
+        fit = sm.OLS(y, sm.add_constant(X)).fit()
+        assert_allclose(result.params.loc[unit].values, fit.params.values,
+                        rtol=1e-6)
+        assert_allclose(result.bse.loc[unit].values, fit.bse.values,
+                        rtol=1e-6)
+        assert_allclose(result.rsquared[unit], fit.rsquared)
+
+
+def test_pooled_matches_ols(panel):
+    result = panel.fit(effects="pooled")
+    designs = [_design(panel, unit) for unit in panel.units]
+    y = np.concatenate([d[0].values for d in designs])
+    X = np.concatenate([d[1].values for d in designs])
+    fit = sm.OLS(y, sm.add_constant(X)).fit()
+    assert_allclose(result.params.values, fit.params, rtol=1e-6)
+    assert_allclose(result.tvalues.values, fit.tvalues, rtol=1e-6)
+
+
+def test_fixed_matches_dummies(panel):
+    result = panel.fit(effects="fixed")
+    designs = [_design(panel, unit) for unit in panel.units]
+    y = np.concatenate([d[0].values for d in designs])
+    X = np.concatenate([d[1].values for d in designs])
+    dummies = pd.get_dummies(np.repeat(panel.units,
+                                       [len(d[0]) for d in designs]))
+    fit = sm.OLS(y, np.column_stack([X, dummies.values.astype(float)])).fit()
+    k = X.shape[1]
+    assert_allclose(result.params.values, fit.params[:k], rtol=1e-6)
+    assert_allclose(result.bse.values, fit.bse[:k], rtol=1e-6)
+    assert_allclose(result.unit_effects.values, fit.params[k:], rtol=1e-6)
+    if not np.isnan(result.resid.iloc[0, 0]):
+        raise AssertionError
+
+
+def test_missing_unit_column(regions):
+    df, truth = regions
+    panel = Panel(df.drop("region2_promo", axis=1), truth["regions"])
+    with pytest.raises(ValueError):
+        panel.add("promo")
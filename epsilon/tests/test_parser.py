@@ -1,3 +1,5 @@
+from numpy.testing import assert_array_equal
+import os
 import epsilon._parser
 import numpy as np
 import pandas as pd
@@ -15,3 +17,82 @@ def df():
 
 def test_read(df):
     eo = epsilon._parser.read(df)
+
+
+@pytest.fixture(scope='function')
+def folder(tmpdir, tmpdir_factory, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir_factory.mktemp("cache")))
+    index = pd.date_range("1999-01-02", periods=4, freq="7D")
+    for i in range(3):
+        df = pd.DataFrame({'var' + str(i): np.arange(4.) * (i + 1)},
+                          index=index)
+        df.to_excel(str(tmpdir.join('region' + str(i) + '.xlsx')),
+                    sheet_name='output')
+    tmpdir.join('broken.xlsx').write('not a workbook')
+    return tmpdir
+
+
+def test_read_folder_order(folder):
+    serial = epsilon._parser.read_folder(str(folder))
+    parallel = epsilon._parser.read_folder(str(folder), workers=2)
+    if parallel.data.columns.tolist() != serial.data.columns.tolist():
+        raise AssertionError
+
+
+def test_read_folder_report(folder):
+    calls = []
+    eo = epsilon._parser.read_folder(
+        str(folder), progress=lambda done, total, file: calls.append(done))
+    report = eo.load_report.set_index("file")
+    if report["loaded"].sum() != 3:
+        raise AssertionError
+    if report.loc[str(folder.join('broken.xlsx')), "error"] is None:
+        raise AssertionError
+    if calls != [1, 2, 3, 4]:
+        raise AssertionError
+
+
+def test_read_folder_cache(folder):
+    calls = []
+    epsilon._parser.read_folder(str(folder))
+    eo = epsilon._parser.read_folder(
+        str(folder), progress=lambda done, total, file: calls.append(file))
+    if calls != [str(folder.join('broken.xlsx'))]:
+        raise AssertionError
+    if eo.data.shape[1] != 3:
+        raise AssertionError
+
+
+def test_read_folder_cache_changed(folder):
+    calls = []
+    epsilon._parser.read_folder(str(folder))
+    index = pd.date_range("1999-01-02", periods=4, freq="7D")
+    pd.DataFrame({'var0': np.arange(4.) * 5}, index=index).to_excel(
+        str(folder.join('region0.xlsx')), sheet_name='output')
+    eo = epsilon._parser.read_folder(
+        str(folder), progress=lambda done, total, file: calls.append(file))
+    if str(folder.join('region0.xlsx')) not in calls or len(calls) != 2:
+        raise AssertionError
+    assert_array_equal(eo.data['var0'], np.arange(4.) * 5)
+
+
+def test_read_folder_cache_outside(folder):
+    epsilon._parser.read_folder(str(folder))
+    if folder.join('.epsilon_cache').check():
+        raise AssertionError
+    if not epsilon._parser._cache_dir(str(folder)).startswith(
+            os.environ["XDG_CACHE_HOME"]):
+        raise AssertionError
+
+
+def test_read_folder_cache_write_fails(folder, monkeypatch):
+    def store(self, file, df):
+        raise ValueError("mixed types")
+    monkeypatch.setattr(epsilon._parser._FragmentCache, "store", store)
+    with pytest.warns(UserWarning):
+        eo = epsilon._parser.read_folder(str(folder))
+    if eo.data.shape[1] != 3:
+        raise AssertionError
+    report = eo.load_report.set_index("file")
+    if report["cache_error"].notnull().sum() != 3:
+        raise AssertionError
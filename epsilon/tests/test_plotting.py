@@ -31,3 +31,113 @@ def test_avm_shape(combined):
 def test_avm_val(combined):
     print(combined.values)
     assert_array_almost_equal(combined.values, np.array([[1., 2.], [3., 2.]]))
+
+
+def test_lttb_keeps_extremes():
+    from epsilon.plotting import _lttb
+    x = np.arange(10000, dtype=float)
+    y = np.sin(x / 500.)
+    y[1234] = 10
+    y[8765] = -10
+    kept = _lttb(x, np.column_stack([y, -y]), 200)
+    if kept.shape != (200, 2):
+        raise AssertionError
+    for i in range(2):
+        if not {0, 1234, 8765, 9999} <= set(kept[:, i]):
+            raise AssertionError
+        if (np.diff(kept[:, i]) <= 0).any():
+            raise AssertionError
+
+
+def test_lttb_short_series():
+    from epsilon.plotting import _lttb
+    kept = _lttb(np.arange(5.), np.arange(5.), 2000)
+    if list(kept[:, 0]) != list(range(5)):
+        raise AssertionError
+
+
+def test_line_shared_budget():
+    from epsilon.plotting import line
+    rng = np.random.RandomState(0)
+    df = pd.DataFrame(rng.randn(50000, 20).cumsum(axis=0),
+                      index=pd.date_range("2000-01-01", periods=50000,
+                                          freq="h").astype(str),
+                      columns=["x"] + ["v" + str(i) for i in range(19)])
+    plot = line(df, max_points=2000, display=False)
+    data = plot.renderers[0].data_source.data
+    if len(data["_x"]) > 2000:
+        raise AssertionError(len(data["_x"]))
+    rows = df.index.get_indexer(
+        pd.DatetimeIndex(data["_x"]).strftime("%Y-%m-%d %H:%M:%S"))
+    for col in ["v0", "v18"]:
+        extremes = {df[col].values.argmax(), df[col].values.argmin()}
+        if not extremes <= set(rows):
+            raise AssertionError(col)
+    # a variable named x is not replaced by the x values of the chart
+    assert_array_almost_equal(data["x"], df["x"].values[rows])
+
+
+def test_stacked_parts():
+    from epsilon.plotting import stackedBarAndLine
+    index = pd.date_range("1999-01-02", periods=2, freq="7D")
+    bars = pd.DataFrame([[1., -2., 3.], [-1., 2., -3.]], index=index,
+                        columns=['a', 'b', 'c'])
+    plot = stackedBarAndLine(pd.Series([1., 2.], index=index, name='y'),
+                             bars, display=False)
+    data = plot.renderers[0].data_source.data
+    assert_array_almost_equal(data['_pos_b'], [0., 2.])
+    assert_array_almost_equal(data['_neg_b'], [-2., 0.])
+    bars = [x for x in plot.renderers if x.glyph.__class__.__name__ == "VBar"]
+    if sorted(x.name for x in bars) != ['a', 'a', 'b', 'b', 'c', 'c']:
+        raise AssertionError
+
+
+@pytest.fixture(scope='module')
+def fitted():
+    from epsilon.datasets import mmm
+    df, truth = mmm(weeks=60, regions=2, channels=2)
+    models = {}
+    for region in truth["regions"]:
+        columns = [x for x in df.columns if x.startswith(region)]
+        eo = EO(df[columns])
+        eo.model.dep(region + '_sales')
+        eo.model.add([region + '_media_0', region + '_promo'])
+        eo.model.ols(summary=False)
+        models[region] = eo
+    return models
+
+
+def test_export(fitted, tmpdir):
+    from epsilon.plotting import export
+    written = export(fitted, str(tmpdir), workers=2)
+    expected = sorted(str(tmpdir.join(region + '_' + chart + '.html'))
+                      for region in fitted for chart in ['avm', 'con', 'res'])
+    if written != expected:
+        raise AssertionError(written)
+    with open(written[0]) as f:
+        if "Bokeh" not in f.read():
+            raise AssertionError
+
+
+def test_chart_not_displayed(fitted, monkeypatch):
+    import epsilon.plotting
+    shown = []
+    monkeypatch.setattr(epsilon.plotting, "show", shown.append)
+    plot = fitted['region0'].model.plotting.avm(display=False)
+    if shown or plot is None:
+        raise AssertionError
+
+
+# test that the charts of a multi target fit show the dependent variable
+def test_multi_target_charts(fitted):
+    eo = fitted['region1']
+    eo.model.dep(['region1_sales', 'region1_media_1'])
+    eo.model.ols(summary=False)
+    for chart in ['avm', 'con', 'res']:
+        if getattr(eo.model.plotting, chart)(display=False) is None:
+            raise AssertionError(chart)
+    chart, args = eo.model.plotting._avm()
+    single = eo.model.fitdetail['region1_sales']
+    assert_array_almost_equal(args[0]['Model'].values, single.predict())
+    eo.model.dep('region1_sales')
+    eo.model.ols(summary=False)
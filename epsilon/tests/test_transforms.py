@@ -0,0 +1,81 @@
+from numpy.testing import assert_array_equal, assert_allclose
+from epsilon._transforms import recursive_filter, saturate
+import numpy as np
+import pytest
+
+
+def _loop_decay(x, dec):
+    # reference implementation of the original per column loop
+    alpha = 1 - dec
+    output = np.empty(len(x), dtype=float)
+    decayed = x[0]
+    output[0] = decayed
+    for i in range(1, len(x)):
+        decayed = ((alpha * decayed) + x[i])
+        output[i] = decayed
+    return output
+
+
+@pytest.fixture(scope='module')
+def block():
+    return np.random.RandomState(0).rand(52, 3) * 100
+
+
+def test_filter_shape(block):
+    out = recursive_filter(block, [0.1, 0.5])
+    if out.shape != (3, 2, 52):
+        raise AssertionError
+
+
+def test_filter_matches_loop(block):
+    decays = [0.1, 0.5, 0.9]
+    out = recursive_filter(block, [1 - dec for dec in decays])
+    for i in range(block.shape[1]):
+        for j, dec in enumerate(decays):
+            assert_array_equal(out[i, j], _loop_decay(block[:, i], dec))
+
+
+def test_filter_float32(block):
+    out = recursive_filter(block, 0.5, dtype=np.float32)
+    if out.dtype != np.float32:
+        raise AssertionError
+    assert_allclose(out[0, 0], _loop_decay(block[:, 0], 0.5), rtol=1e-5)
+
+
+def test_filter_series():
+    out = recursive_filter([1., 0., 0.], 0.5)
+    assert_array_equal(out[0, 0], [1., 0.5, 0.25])
+
+
+def test_saturate_shape(block):
+    out = saturate(block, [0.5, 1.0], 'atan')
+    if out.shape != (52, 2, 3):
+        raise AssertionError
+
+
+def test_saturate_atan(block):
+    std = block / block.max(axis=0)
+    out = saturate(block, [0.5, 1.0], 'atan')
+    assert_allclose(out[:, 1, :], np.arctan(std / 1.0) / (np.pi / 2))
+
+
+def test_saturate_atansq(block):
+    std = block / block.max(axis=0)
+    out = saturate(block, 0.5, 'atansq')
+    assert_allclose(out[:, 0, :], np.arctan(std / 0.5) ** 2 / (np.pi / 2))
+
+
+def test_saturate_pow(block):
+    out = saturate(block, [2], 'pow', scale=False)
+    assert_allclose(out[:, 0, :], block ** 2)
+
+
+def test_saturate_hill_half(block):
+    out = saturate(block, 0.5, 'hill', shape=2.0)
+    std = block / block.max(axis=0)
+    assert_allclose(out[:, 0, :], std ** 2 / (std ** 2 + 0.25))
+
+
+def test_saturate_unknown_curve(block):
+    with pytest.raises(ValueError):
+        saturate(block, 0.5, 'tanh')
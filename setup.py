@@ -14,6 +14,7 @@ install_requires = [
     'numpy',
     'pandas',
     'pyarrow',
+    'scipy',
     'pytest',
     'bokeh'
 ]